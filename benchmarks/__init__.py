@@ -0,0 +1 @@
+"""Benchmarks for the address book. Run them from the project root with `python -m benchmarks.<name>`."""
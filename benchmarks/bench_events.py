@@ -0,0 +1,176 @@
+"""Measures the cost of change events and checks state derived from them incrementally.
+
+Runs the same random workload of record, phone, address, note and tag changes, imports
+and deletions three times: without listeners, with a listener that does nothing and
+with ``DerivedCounts``, which keeps contacts per city, the number of phones and tag
+counts up to date from the events alone. Exits with status 1 when the derived counts
+disagree with counts recomputed from the book. ``--sqlite`` runs the workload on a
+SQLite book, whose records are loaded from the database as they are touched.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.generator import CITIES, TAGS, WORDS, generate_book, generate_record, phone
+from models import (
+    AddressBook,
+    FieldChanged,
+    NoteAdded,
+    NoteRemoved,
+    RecordAdded,
+    RecordRemoved,
+    RecordsCleared,
+    TagsChanged,
+)
+from storage import SQLiteAddressBook, merge_rows
+
+
+class DerivedCounts:
+    """Listener keeping per-city contact counts, the phone count and tag counts in O(change)."""
+
+    def __init__(self, book: AddressBook):
+        self.cities, self.phones, self.tags = recount(book)
+
+    def _count_record(self, record, sign: int):
+        if record.address:
+            self.cities[record.address.city] += sign
+        self.phones += sign * len(record.phones)
+
+    def __call__(self, events):
+        for event in events:
+            if isinstance(event, RecordAdded):
+                self._count_record(event.record, 1)
+            elif isinstance(event, RecordRemoved):
+                self._count_record(event.record, -1)
+            elif isinstance(event, RecordsCleared):
+                self.cities.clear()
+                self.phones = 0
+            elif isinstance(event, FieldChanged) and event.field == "address":
+                if event.old:
+                    self.cities[event.old.city] -= 1
+                if event.new:
+                    self.cities[event.new.city] += 1
+            elif isinstance(event, FieldChanged) and event.field == "phones":
+                self.phones += (event.new is not None) - (event.old is not None)
+            elif isinstance(event, NoteAdded):
+                self.tags.update(event.note.tags)
+            elif isinstance(event, NoteRemoved):
+                self.tags.subtract(event.note.tags)
+            elif isinstance(event, TagsChanged):
+                self.tags.update(event.added)
+                self.tags.subtract(event.removed)
+
+
+def recount(book: AddressBook) -> tuple[Counter, int, Counter]:
+    """Returns contacts per city, the number of phones and tag counts, from scratch."""
+    cities = Counter(record.address.city for record in book.data.values() if record.address)
+    phones = sum(len(record.phones) for record in book.data.values())
+    tags = Counter(tag for note in book.notes.values() for tag in note.tags)
+    return cities, phones, tags
+
+
+def workload(book: AddressBook, operations: int, seed: int):
+    """Runs random changes on the book."""
+    rng = random.Random(seed)
+    names = [record.name.value for record in book.data.values()]
+    titles = list(book.notes)
+    number = len(names)
+    for step in range(operations):
+        choice = rng.random()
+        if choice < 0.2:
+            record = generate_record(rng, number)
+            number += 1
+            book.add_record(record)
+            names.append(record.name.value)
+        elif choice < 0.35 and names:
+            book.delete(names.pop(rng.randrange(len(names))))
+        elif choice < 0.55 and names:
+            record = book.find(rng.choice(names))
+            if len(record.phones) < 4:
+                try:
+                    record.add_phone(phone(rng))
+                except ValueError:
+                    pass
+            elif record.phones:
+                record.remove_phone(record.phones[0].value)
+        elif choice < 0.7 and names:
+            city, postal_prefix = rng.choice(CITIES)
+            book.find(rng.choice(names)).edit_address("Soborna 1", city, f"{postal_prefix}000", "Ukraine")
+        elif choice < 0.8:
+            title = f"event{step}"
+            book.add_note(title, " ".join(rng.choices(WORDS, k=5)), rng.sample(TAGS, 2))
+            titles.append(title)
+        elif choice < 0.9 and titles:
+            title = rng.choice(titles)
+            if title in book.notes:
+                book.add_tags_to_note(title, [rng.choice(TAGS)])
+                book.remove_tags_from_note(title, [book.notes[title].tags[0]])
+        elif choice < 0.95 and titles:
+            book.delete_note_by_title(titles.pop(rng.randrange(len(titles))))
+        elif choice < 0.9995:
+            rows = [[f"Imported{step}x{i}", [phone(rng)], None, None, ["Franka 2", "Kyiv", "01001", "Ukraine"]] for i in range(20)]
+            merge_rows(book, rows)
+            names += [row[0] for row in rows]
+        else:
+            book.delete_all()
+            names.clear()
+
+
+def to_sqlite(book: AddressBook, filename: str) -> SQLiteAddressBook:
+    """Copies the book into a new SQLite database."""
+    sqlite_book = SQLiteAddressBook(filename)
+    for record in book.data.values():
+        sqlite_book.data[record.name] = record
+    for title, note in book.notes.items():
+        sqlite_book.notes[title] = note
+    sqlite_book.commit()
+    return sqlite_book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=20_000)
+    parser.add_argument("--operations", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sqlite", action="store_true", help="run on a SQLite book")
+    options = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    derived = None
+    print(f"{'listeners':<10} {'changes/s':>12}")
+    for mode in ("none", "no-op", "derived"):
+        book = generate_book(options.contacts, seed=options.seed)
+        if options.sqlite:
+            book = to_sqlite(book, os.path.join(directory.name, f"{mode}.db"))
+        if mode == "no-op":
+            book.events.subscribe(lambda events: None)
+        elif mode == "derived":
+            derived = book.events.subscribe(DerivedCounts(book))
+        start = time.perf_counter()
+        workload(book, options.operations, options.seed)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<10} {options.operations / elapsed:>12,.0f}")
+
+    cities, phones, tags = recount(book)
+    problems = []
+    if +derived.cities != cities:
+        problems.append("contacts per city")
+    if derived.phones != phones:
+        problems.append(f"phones: {derived.phones} derived, {phones} counted")
+    if +derived.tags != tags:
+        problems.append("tag counts")
+    print(f"derived state: {'OK' if not problems else 'differs in ' + ', '.join(problems)}")
+    if options.sqlite:
+        book.close()
+    directory.cleanup()
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Reports memory and pickle size per contact with tracemalloc."""
+
+import argparse
+import pickle
+import random
+import string
+import tracemalloc
+
+from models import AddressBook, Record
+
+CITIES = ["Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Zaporizhzhia", "Vinnytsia", "Poltava"]
+TAGS = ["work", "family", "todo", "ideas", "travel", "shopping", "urgent", "later"]
+
+
+def build_records(size: int, seed: int = 42) -> dict:
+    """Builds records with a phone, birthday, email and address each."""
+    rng = random.Random(seed)
+    records = {}
+    for i in range(size):
+        name = "".join(rng.choices(string.ascii_lowercase, k=8)).capitalize() + str(i)
+        record = Record(name)
+        record.add_phone(f"+380{rng.randint(100_000_000, 999_999_999)}")
+        record.add_birthday(f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2005)}")
+        record.add_email(f"{name.lower()}@example.com")
+        record.add_address(f"Street {rng.randint(1, 200)}", rng.choice(CITIES), f"{rng.randint(1000, 99999):05d}", "UA")
+        records[record.name] = record
+    return records
+
+
+def measure(size: int) -> dict:
+    """Returns bytes per contact for bare records, an indexed book and the pickle file."""
+    tracemalloc.start()
+    records = build_records(size)
+    records_bytes = tracemalloc.get_traced_memory()[0]
+    book = AddressBook(records)
+    rng = random.Random(0)
+    for i in range(size // 10):
+        book.add_note(f"note{i}", "some text", [rng.choice(TAGS), rng.choice(TAGS)])
+    book_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pickle_bytes = len(pickle.dumps({"contacts": book.data, "notes": book.notes}))
+    return {
+        "records": records_bytes / size,
+        "book": book_bytes / size,
+        "pickle": pickle_bytes / size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    options = parser.parse_args()
+
+    print(f"{'contacts':>10} {'records, B':>12} {'book, B':>10} {'pickle, B':>10}")
+    for size in options.sizes:
+        result = measure(size)
+        print(f"{size:>10} {result['records']:>12.0f} {result['book']:>10.0f} {result['pickle']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
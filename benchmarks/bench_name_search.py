@@ -0,0 +1,65 @@
+"""Compares trigram index name search with a linear scan over all records."""
+
+import argparse
+import random
+import string
+import time
+
+from models import AddressBook, Record
+
+QUERIES = ["ann", "ko", "enko", "petr", "zzz"]
+
+
+def random_name(rng: random.Random) -> str:
+    """Returns a random capitalized name."""
+    first = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 8))).capitalize()
+    last = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9))).capitalize()
+    return f"{first}_{last}"
+
+
+def build_book(size: int, seed: int = 42) -> AddressBook:
+    """Builds an address book with random names."""
+    rng = random.Random(seed)
+    book = AddressBook()
+    while len(book.data) < size:
+        name = random_name(rng)
+        if book.find(name, raise_error=False) is None:
+            book.add_record(Record(name))
+    return book
+
+
+def scan(book: AddressBook, query: str) -> list:
+    """Substring search as it was done before the index."""
+    query = query.lower()
+    return [record for record in book.data.values() if query in record.name.value.lower()]
+
+
+def measure(func, repeat: int) -> float:
+    """Returns the best time of a function call in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    print(f"{'contacts':>10} {'query':>6} {'matches':>8} {'scan, ms':>10} {'index, ms':>10}")
+    for size in options.sizes:
+        book = build_book(size)
+        for query in QUERIES:
+            matches = len(book.name_index.search(query))
+            assert matches == len(scan(book, query))
+            scan_ms = measure(lambda: scan(book, query), options.repeat)
+            index_ms = measure(lambda: book.name_index.search(query), options.repeat)
+            print(f"{size:>10} {query:>6} {matches:>8} {scan_ms:>10.3f} {index_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measures repeated listings and exports of an unchanged book, which reuse the rendered text of records.
+
+For every size the book is listed (``all``) and exported to CSV three times: cold,
+again unchanged, and after changing one record in a hundred. Also shows how much
+memory the cached text of a full listing takes.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.generator import generate_book
+from dialogs import use_plain_output
+from dialogs.print_text import print_records
+from storage import export_file
+
+# Every this many records one is changed before the last run.
+CHANGE_EVERY = 100
+
+
+def listing_ms(book) -> float:
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        print_records(book.iter_records())
+    return (time.perf_counter() - start) * 1000
+
+
+def export_ms(book, filename: str) -> float:
+    start = time.perf_counter()
+    export_file(book, "csv", filename)
+    return (time.perf_counter() - start) * 1000
+
+
+def change_some(book):
+    for number, record in enumerate(book.data.values()):
+        if number % CHANGE_EVERY == 0:
+            record.add_address("Soborna 1", "Lviv", "79000", "Ukraine")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    options = parser.parse_args()
+    use_plain_output()
+
+    print(f"{'contacts':>10} {'run':<12} {'all, ms':>10} {'export, ms':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "contacts.csv")
+        for size in options.sizes:
+            book = generate_book(size, notes=0)
+            print(f"{size:>10} {'cold':<12} {listing_ms(book):>10.1f} {'':>11}")
+            cached = sum(sys.getsizeof(str(record)) for record in book.data.values())
+            print(f"{size:>10} {'repeat':<12} {listing_ms(book):>10.1f} {'':>11}")
+
+            # Exports replace the listing text in the cache, and the other way round.
+            print(f"{size:>10} {'export cold':<12} {'':>10} {export_ms(book, filename):>11.1f}")
+            print(f"{size:>10} {'export again':<12} {'':>10} {export_ms(book, filename):>11.1f}")
+            change_some(book)
+            print(f"{size:>10} {'1% changed':<12} {'':>10} {export_ms(book, filename):>11.1f}")
+            listing_ms(book)
+            change_some(book)
+            print(f"{size:>10} {'1% changed':<12} {listing_ms(book):>10.1f} {'':>11}")
+            print(f"{size:>10} text cached by a listing: {cached / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
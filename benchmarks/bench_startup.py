@@ -0,0 +1,95 @@
+"""Measures cold start: import time of main, UI modules loaded at import and batch wall clock.
+
+Exits with status 1 when prompt_toolkit is imported by ``import main`` or the import
+takes longer than ``--max-import-ms``, so it can guard against startup regressions.
+"""
+
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_memory import build_records
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time_ms(repeat: int) -> float:
+    """Returns the best cumulative import time of main reported by ``-X importtime``."""
+    best = float("inf")
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in result.stderr.splitlines():
+            _, cumulative, module = line.split("|")
+            if module.strip() == "main":
+                best = min(best, int(cumulative) / 1000)
+    return best
+
+
+def ui_modules() -> list[str]:
+    """Returns the prompt_toolkit modules loaded by ``import main``."""
+    code = "import sys, main; print(*sorted(m for m in sys.modules if m.startswith('prompt_toolkit')))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def batch_wall_ms(directory: str, repeat: int) -> float:
+    """Returns the best wall clock of a one-command batch run, including loading the book."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "main.py"), "--batch", "-", "--quiet"],
+            cwd=directory,
+            input="help\n",
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def load_ms(filename: str) -> float:
+    """Returns the time load_data takes, which the REPL overlaps with the first dialog."""
+    from main import load_data
+
+    start = time.perf_counter()
+    load_data(filename)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, nargs="+", default=[0, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    options = parser.parse_args()
+
+    import_ms = import_time_ms(options.repeat)
+    modules = ui_modules()
+    print(f"import main: {import_ms:.1f} ms, prompt_toolkit modules loaded: {len(modules)}")
+
+    print(f"{'contacts':>10} {'load_data, ms':>14} {'batch help, ms':>15}")
+    for size in options.contacts:
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "addressbook.pkl")
+            with open(filename, "wb") as f:
+                pickle.dump({"contacts": build_records(size), "notes": {}}, f)
+            print(f"{size:>10} {load_ms(filename):>14.1f} {batch_wall_ms(directory, options.repeat):>15.1f}")
+
+    if modules or (options.max_import_ms is not None and import_ms > options.max_import_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Times every AddressBook operation on generated books and writes the results as JSON.
+
+Each operation runs in batches on a book of every size; the best batch is reported
+as milliseconds per operation. With ``--baseline`` the results are compared with an
+earlier run and the script exits with status 1 when an operation got slower than the
+tolerance allows, e.g.
+
+    python -m benchmarks.bench_suite --sizes 1000 100000 --output baseline.json
+    python -m benchmarks.bench_suite --sizes 1000 100000 --baseline baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import TAGS, WORDS, generate_book, generate_record
+from main import book_snapshot, load_data, save_data
+
+# Operations per timed batch; slow operations run fewer times.
+BATCH = 1000
+
+
+def measure(func, operations: int, repeat: int, setup=None, cleanup=None) -> float:
+    """Returns the best time per operation in milliseconds of a batch function.
+
+    ``setup`` and ``cleanup`` run around every batch without being timed.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+        if cleanup is not None:
+            cleanup()
+    return best / operations * 1000
+
+
+def operations(book, size: int, seed: int, directory: str):
+    """Yields (name, batch function, operations per batch, setup, cleanup) for a book of the given size."""
+    rng = random.Random(seed)
+    names = [record.name.value for record in rng.sample(list(book.data.values()), min(BATCH, size))]
+    emails = [book.find(name).email.value for name in names]
+    phones = [book.find(name).phones[0].value[3:] for name in names[:100]]
+    birthdays = [str(book.find(name).birthday) for name in names[:100]]
+    substrings = [name[2:6].lower() for name in names[:100]]
+    titles = list(book.notes)[:BATCH]
+    numbers = iter(range(size, sys.maxsize))
+    new_records = []
+    new_notes = [(f"bench{number}", " ".join(rng.choices(WORDS, k=10)), rng.sample(TAGS, 2)) for number in range(BATCH)]
+
+    def generate():
+        new_records[:] = [generate_record(rng, next(numbers)) for _ in range(BATCH)]
+
+    def add_records():
+        for record in new_records:
+            book.add_record(record)
+
+    def delete_records():
+        for record in new_records:
+            book.delete(record.name.value)
+
+    def add_notes():
+        for title, text, tags in new_notes:
+            book.add_note(title, text, tags)
+
+    def delete_notes():
+        for title, *_ in new_notes:
+            book.delete_note_by_title(title)
+
+    def add_tags():
+        for title in titles:
+            book.add_tags_to_note(title, ["bench"])
+
+    def remove_tags():
+        for title in titles:
+            book.remove_tags_from_note(title, ["bench"])
+
+    filename = os.path.join(directory, f"addressbook{size}.pkl")
+    quarter = (datetime.date(2026, 10, 1), datetime.date(2026, 12, 31))
+
+    yield "add_record", add_records, BATCH, generate, delete_records
+    yield "delete", delete_records, BATCH, lambda: (generate(), add_records()), None
+    yield "find", lambda: [book.find(name) for name in names], len(names), None, None
+    yield "find_fuzzy", lambda: [book.find_fuzzy(name[:-1] + "x") for name in names[:100]], 100, None, None
+    yield "find_by_query_name", lambda: [book.find_by_query([query]) for query in substrings], 100, None, None
+    yield "find_by_query_phone", lambda: [book.find_by_query([phone]) for phone in phones], 100, None, None
+    yield "find_by_query_birthday", lambda: [book.find_by_query([day]) for day in birthdays], 100, None, None
+    yield "iter_by_query_page", lambda: [list(book.iter_by_query([query], limit=20)) for query in substrings], 100, None, None
+    yield "search_by_email", lambda: [book.search_by_email(email) for email in emails], len(emails), None, None
+    yield "find_by_domain", lambda: [book.find_by_domain("ukr.net") for _ in range(10)], 10, None, None
+    yield "get_upcoming_birthdays_7", lambda: [book.get_upcoming_birthdays(7) for _ in range(10)], 10, None, None
+    yield "get_upcoming_birthdays_365", lambda: book.get_upcoming_birthdays(365), 1, None, None
+    yield "birthday_stats", lambda: book.birthday_stats(), 1, None, None
+    yield "get_milestone_birthdays_quarter", lambda: book.get_milestone_birthdays([30, 40, 50], *quarter), 1, None, None
+    yield "add_note", add_notes, BATCH, None, delete_notes
+    yield "add_tags_to_note", add_tags, len(titles), None, remove_tags
+    yield "remove_tags_from_note", remove_tags, len(titles), add_tags, None
+    yield "query_notes_by_tags", lambda: [book.query_notes_by_tags([[tag]]) for tag in TAGS], len(TAGS), None, None
+    yield "query_notes_by_tags_and_or_not", lambda: book.query_notes_by_tags([["work", "family"], ["todo"]], ["later"]), 1, None, None
+    yield "tag_counts", lambda: [book.tag_counts() for _ in range(10)], 10, None, None
+    yield "search_notes", lambda: [book.search_notes(word) for word in WORDS], len(WORDS), None, None
+    yield "save_data", lambda: save_data(book_snapshot(book), filename), 1, None, None
+    yield "load_data", lambda: load_data(filename), 1, None, None
+
+
+def run(sizes: list[int], repeat: int, seed: int) -> list[dict]:
+    """Runs all operations at all sizes and returns one result per (size, operation)."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            start = time.perf_counter()
+            book = generate_book(size, seed=seed)
+            print(f"{size} contacts generated in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            for name, func, count, setup, cleanup in operations(book, size, seed, directory):
+                ms = measure(func, count, repeat, setup, cleanup)
+                results.append({"size": size, "operation": name, "ms": ms})
+                print(f"{size:>10} {name:<32} {ms:>12.4f} ms", file=sys.stderr)
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Prints the change against the baseline and returns the operations that got slower."""
+    previous = {(item["size"], item["operation"]): item["ms"] for item in baseline["results"]}
+    regressions = []
+    print(f"{'contacts':>10} {'operation':<32} {'baseline, ms':>12} {'now, ms':>12} {'change':>8}")
+    for item in results:
+        key = (item["size"], item["operation"])
+        if key not in previous:
+            continue
+        change = item["ms"] / previous[key] - 1 if previous[key] else 0.0
+        flag = " slower" if change > tolerance else ""
+        print(f"{item['size']:>10} {item['operation']:<32} {previous[key]:>12.4f} {item['ms']:>12.4f} {change:>+8.0%}{flag}")
+        if flag:
+            regressions.append(f"{item['operation']} at {item['size']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 is 25%%")
+    options = parser.parse_args()
+
+    results = run(options.sizes, options.repeat, options.seed)
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": options.seed,
+        "repeat": options.repeat,
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        if regressions:
+            print(f"Slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+    elif not options.output:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Drives the command selection dialog with piped key presses and checks what it returns.
+
+Selects the second command of the list and types its arguments, then cancels the
+dialog with its Exit button. Exits with status 1 when either result is wrong.
+"""
+
+import asyncio
+import sys
+
+from dialogs import ask_command
+from models import Commands, commands_config
+
+# Cursor down, select, Tab to the Ok button, Enter.
+SELECT_SECOND = "\x1b[B \t\r"
+# Tab to Ok, Tab to Exit, Enter.
+CANCEL = "\t\t\r"
+
+
+async def run_dialog(keys: str, answer: str | None = None):
+    """Runs ask_command on piped input and returns its result."""
+    from prompt_toolkit.application import create_app_session
+    from prompt_toolkit.input import create_pipe_input
+    from prompt_toolkit.output import DummyOutput
+
+    with create_pipe_input() as pipe, create_app_session(input=pipe, output=DummyOutput()):
+        pipe.send_text(keys)
+        dialog = asyncio.ensure_future(ask_command())
+        if answer is not None:
+            # The arguments prompt starts after the dialog has closed.
+            await asyncio.sleep(0.5)
+            pipe.send_text(answer + "\r")
+        return await asyncio.wait_for(dialog, timeout=10)
+
+
+def main():
+    second = list(commands_config)[1]
+    expected = [(second.value, ["Ann", "01.01.1990"]), (Commands.EXIT.value, None)]
+    results = [
+        asyncio.run(run_dialog(SELECT_SECOND, "Ann 01.01.1990")),
+        asyncio.run(run_dialog(CANCEL)),
+    ]
+    for result, wanted in zip(results, expected):
+        print(f"{'OK' if result == wanted else 'FAILED'}: {result}, expected {wanted}")
+    if results != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Checks that a journal replays to the same book as the commands that wrote it.
+
+Runs random commands through the command registry on a journaled book, many of them
+failing on purpose, with a contacts import in between and a compaction that writes its
+snapshot in the background while the commands go on. The journal
+is then loaded again from disk and every contact and note compared with the live
+book. Exits with status 1 when any of them differs.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+from benchmarks.generator import TAGS, WORDS, birthday, generate_book, phone
+from dialogs import use_plain_output
+from models import get_command_config
+from storage import Journal, export_file
+
+
+def random_command(rng: random.Random, names: list[str], titles: list[str]) -> list[str]:
+    """Returns a command line; unknown names, duplicates and bad values make some of them fail."""
+    name = rng.choice(names)
+    title = rng.choice(titles)
+    city = rng.choice(["Kyiv", "Lviv", "Odesa"])
+    return rng.choice(
+        [
+            ["add", name, phone(rng)],
+            ["add", name, "12345"],
+            ["change", name, phone(rng), phone(rng)],
+            ["add_birthday", name, birthday(rng)],
+            ["add_birthday", name, "31.02.2000"],
+            ["add_email", name, f"{name.lower()}@example.com"],
+            ["edit_email", name, f"{name.lower()}@mail.example"],
+            ["remove_email", name],
+            ["add_address", name, "Soborna 1", city, "01001", "Ukraine"],
+            ["edit_address", name, "Franka 2", city, "79000", "Ukraine"],
+            ["delete_address", name],
+            ["delete", name],
+            ["add_note", title, *rng.choices(WORDS, k=3)],
+            ["add_note", title],
+            ["edit_note", title, *rng.choices(WORDS, k=2)],
+            ["delete_note", title],
+            ["add_tags", title, *rng.sample(TAGS, 2)],
+            ["remove_tags", title, rng.choice(TAGS)],
+        ]
+    )
+
+
+def run(line: list[str], book):
+    command, *args = line
+    get_command_config(command).run(args, book)
+
+
+def contents(book) -> tuple[dict, dict]:
+    """Returns the text of every contact and the text and tags of every note."""
+    records = {record.name.value: str(record) for record in book.data.values()}
+    notes = {title: (note.text, list(note.tags)) for title, note in book.notes.items()}
+    return records, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    options = parser.parse_args()
+    use_plain_output()
+
+    rng = random.Random(options.seed)
+    names = [f"Contact{number}" for number in range(50)]
+    titles = [f"note{number}" for number in range(20)]
+    with tempfile.TemporaryDirectory() as directory:
+        journal_file = os.path.join(directory, "book.journal")
+        snapshot = os.path.join(directory, "book.pkl")
+        contacts_file = os.path.join(directory, "contacts.csv")
+        export_file(generate_book(200, notes=0, seed=options.seed), "csv", contacts_file)
+
+        journal = Journal(journal_file, snapshot)
+        book = journal.load()
+        with redirect_stdout(io.StringIO()):
+            for step in range(options.commands):
+                run(random_command(rng, names, titles), book)
+                if step == options.commands // 3:
+                    journal.compact(book)
+                elif step == options.commands // 2:
+                    run(["import", contacts_file], book)
+        journal.close()
+
+        replayed = Journal(journal_file, snapshot).load()
+        replayed.journal.close()
+
+    live_records, live_notes = contents(book)
+    records, notes = contents(replayed)
+    problems = []
+    if records != live_records:
+        problems.append(f"contacts ({sum(records.get(name) != text for name, text in live_records.items())} differ)")
+    if notes != live_notes:
+        problems.append("notes")
+    print(f"{len(live_records)} contacts, {len(live_notes)} notes after {options.commands} commands")
+    print(f"replay: {'OK' if not problems else 'differs in ' + ', '.join(problems)}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Checks that contacts and notes read back from a SQLite book equal the ones stored.
+
+Stores a generated book with a few notes whose tags contain spaces, changes one of
+them in place, reopens the database and compares every contact and note with the
+in-memory book. Exits with status 1 when any of them differs.
+"""
+
+import os
+import sys
+import tempfile
+
+from benchmarks.generator import generate_book
+from storage import SQLiteAddressBook
+
+# Tags that a space-separated column would split or drop.
+TAGS = [["a b", "c"], ["two words", "more than two words"], [" leading", "trailing "]]
+
+
+def note_values(notes) -> dict:
+    return {title: (note.text, list(note.tags)) for title, note in notes.items()}
+
+
+def record_values(records) -> dict:
+    return {record.name.value: str(record) for record in records}
+
+
+def main():
+    book = generate_book(1_000, seed=7)
+    for number, tags in enumerate(TAGS):
+        book.add_note(f"spaced{number}", "Tags with spaces", tags)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "roundtrip.db")
+        stored = SQLiteAddressBook(filename)
+        for record in book.data.values():
+            stored.data[record.name] = record
+        for title, note in book.notes.items():
+            stored.notes[title] = note
+        stored.commit()
+        # A change in place writes the note back from what was read.
+        book.add_tags_to_note("spaced0", ["d e"])
+        stored.add_tags_to_note("spaced0", ["d e"])
+        stored.close()
+
+        reopened = SQLiteAddressBook(filename)
+        problems = []
+        if note_values(reopened.notes) != note_values(book.notes):
+            problems.append("notes")
+        if record_values(reopened.data.values()) != record_values(book.data.values()):
+            problems.append("contacts")
+        print(f"spaced0 tags: {reopened.notes['spaced0'].tags}")
+        reopened.close()
+
+    print(f"round trip: {'OK' if not problems else 'differs in ' + ', '.join(problems)}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Seeded generator of realistic contacts and notes for benchmarks."""
+
+import random
+
+from models import AddressBook, Record
+
+FIRST_NAMES = [
+    "Oleksandr", "Andrii", "Dmytro", "Serhii", "Mykola", "Ivan", "Yurii", "Taras", "Bohdan", "Vasyl",
+    "Olena", "Iryna", "Nataliia", "Oksana", "Tetiana", "Yuliia", "Kateryna", "Mariia", "Sofiia", "Halyna",
+]
+LAST_NAMES = [
+    "Melnyk", "Shevchenko", "Boiko", "Kovalenko", "Bondarenko", "Tkachenko", "Kovalchuk", "Kravchenko",
+    "Oliinyk", "Shevchuk", "Koval", "Polishchuk", "Bondar", "Tkachuk", "Moroz", "Marchenko", "Lysenko",
+    "Rudenko", "Savchenko", "Petrenko",
+]
+# Mobile operator codes: Kyivstar, Vodafone and lifecell.
+OPERATOR_CODES = ["67", "68", "96", "97", "98", "50", "66", "95", "99", "63", "73", "93"]
+EMAIL_DOMAINS = ["gmail.com", "ukr.net", "i.ua", "meta.ua", "outlook.com", "example.com.ua"]
+CITIES = [
+    ("Kyiv", "01"), ("Kharkiv", "61"), ("Odesa", "65"), ("Dnipro", "49"), ("Lviv", "79"),
+    ("Zaporizhzhia", "69"), ("Vinnytsia", "21"), ("Poltava", "36"), ("Chernihiv", "14"), ("Uzhhorod", "88"),
+]
+STREETS = ["Shevchenka", "Franka", "Khreshchatyk", "Soborna", "Nezalezhnosti", "Hrushevskoho", "Lesi Ukrainky"]
+TAGS = ["work", "family", "todo", "ideas", "travel", "shopping", "urgent", "later", "birthday", "finance"]
+WORDS = [
+    "call", "meeting", "project", "report", "gift", "ticket", "train", "dinner", "invoice", "deadline",
+    "doctor", "school", "weekend", "budget", "review", "draft", "order", "delivery", "plan", "visit",
+]
+
+# One contact in this many is born on Feb 29, close to the real share of leap days.
+LEAP_DAY_EVERY = 1461
+
+
+def contact_name(rng: random.Random, number: int) -> str:
+    """Returns a unique one-word contact name; the number keeps names unique at any scale."""
+    return f"{rng.choice(FIRST_NAMES)}_{rng.choice(LAST_NAMES)}{number}"
+
+
+def phone(rng: random.Random) -> str:
+    """Returns a Ukrainian mobile number in the normalized +380XXXXXXXXX form."""
+    return f"+380{rng.choice(OPERATOR_CODES)}{rng.randrange(10_000_000):07d}"
+
+
+def birthday(rng: random.Random) -> str:
+    """Returns a birthday as DD.MM.YYYY, Feb 29 of a leap year for about one contact in 1461."""
+    if rng.randrange(LEAP_DAY_EVERY) == 0:
+        return f"29.02.{rng.choice(range(1952, 2005, 4))}"
+    return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2005)}"
+
+
+def generate_record(rng: random.Random, number: int) -> Record:
+    """Returns a contact with one to three phones, an email, a birthday and an address."""
+    name = contact_name(rng, number)
+    record = Record(name)
+    for _ in range(rng.choice((1, 1, 1, 2, 2, 3))):
+        try:
+            record.add_phone(phone(rng))
+        except ValueError:
+            pass  # the same number drawn twice
+    record.add_birthday(birthday(rng))
+    record.add_email(f"{name.lower()}@{rng.choice(EMAIL_DOMAINS)}")
+    city, postal_prefix = rng.choice(CITIES)
+    record.add_address(f"{rng.choice(STREETS)} {rng.randint(1, 150)}", city, f"{postal_prefix}{rng.randrange(1000):03d}", "Ukraine")
+    return record
+
+
+def generate_records(size: int, seed: int = 42) -> dict:
+    """Returns ``size`` contacts keyed by name, the same ones for the same seed."""
+    rng = random.Random(seed)
+    records = {}
+    for number in range(size):
+        record = generate_record(rng, number)
+        records[record.name] = record
+    return records
+
+
+def generate_notes(size: int, seed: int = 42) -> list[tuple[str, str, list[str]]]:
+    """Returns ``size`` notes as (title, text, tags) with zero to three tags each."""
+    rng = random.Random(seed)
+    return [
+        (f"note{number}", " ".join(rng.choices(WORDS, k=rng.randint(5, 20))), rng.sample(TAGS, rng.randint(0, 3)))
+        for number in range(size)
+    ]
+
+
+def generate_book(size: int, notes: int | None = None, seed: int = 42) -> AddressBook:
+    """Returns an address book with ``size`` contacts and a tenth as many notes by default."""
+    book = AddressBook(generate_records(size, seed))
+    for title, text, tags in generate_notes(size // 10 if notes is None else notes, seed):
+        book.add_note(title, text, tags)
+    return book
@@ -0,0 +1,176 @@
+"""Runs mixed read/write workloads on one address book from many threads and checks the result.
+
+Every thread picks operations at random: queries under the read lock, full scans of
+snapshots, and writes (add, add phone, delete, delete all, notes and tags) under the
+write lock. Snapshot scans must not change while they run, no operation may raise,
+and afterwards the indexes must agree with the records. Exits with status 1 otherwise.
+
+``--unsafe`` runs the same workload on the bare book without locks or snapshots to
+show what the wrapper protects against.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from benchmarks.bench_memory import TAGS, build_records
+from models import AddressBook, ConcurrentAddressBook, Record
+
+
+class Unsafe:
+    """The interface of ConcurrentAddressBook without any locking, for comparison."""
+
+    def __init__(self, book: AddressBook):
+        self.book = book
+
+    @contextmanager
+    def read(self):
+        yield self.book
+
+    write = read
+
+    def snapshot(self) -> AddressBook:
+        return self.book
+
+
+class Worker(threading.Thread):
+    """Thread running random operations until the deadline."""
+
+    def __init__(self, number: int, shared, deadline: float, write_ratio: float):
+        super().__init__(name=f"worker-{number}")
+        self.number = number
+        self.shared = shared
+        self.deadline = deadline
+        self.write_ratio = write_ratio
+        self.rng = random.Random(number)
+        self.names: list[str] = []
+        self.added = 0
+        self.reads = 0
+        self.writes = 0
+        self.scans = 0
+        self.errors: list[str] = []
+
+    def run(self):
+        while time.perf_counter() < self.deadline:
+            try:
+                if self.rng.random() < self.write_ratio:
+                    self.write()
+                    self.writes += 1
+                elif self.rng.random() < 0.05:
+                    self.scan()
+                    self.scans += 1
+                else:
+                    self.read()
+                    self.reads += 1
+            except Exception as err:  # the point of the test is to catch any of them
+                self.errors.append(f"{type(err).__name__}: {err}")
+
+    def read(self):
+        query = "".join(self.rng.choices("abcdefghij", k=3))
+        with self.shared.read() as book:
+            book.find_by_query([query])
+            book.find(self.rng.choice(self.names) if self.names else "Nobody", raise_error=False)
+            book.get_upcoming_birthdays(3)
+            book.query_notes_by_tags([[self.rng.choice(TAGS)]])
+
+    def scan(self):
+        snapshot = self.shared.snapshot()
+        first = [(record.name.value, tuple(record.phones), record.email) for record in snapshot.iter_records()]
+        first += [(note.title, tuple(note.tags)) for note in snapshot.iter_notes()]
+        second = [(record.name.value, tuple(record.phones), record.email) for record in snapshot.iter_records()]
+        second += [(note.title, tuple(note.tags)) for note in snapshot.iter_notes()]
+        if first != second:
+            self.errors.append("snapshot changed during a scan")
+
+    def write(self):
+        choice = self.rng.random()
+        with self.shared.write() as book:
+            if choice < 0.4 or not self.names:
+                name = f"Worker{self.number}x{self.added}"
+                self.added += 1
+                record = Record(name)
+                record.add_phone(f"+380{self.rng.randint(100_000_000, 999_999_999)}")
+                book.add_record(record)
+                self.names.append(name)
+            elif choice < 0.6:
+                record = book.find(self.rng.choice(self.names), raise_error=False)
+                if record is not None and len(record.phones) < 5:
+                    record.add_phone(f"+380{self.rng.randint(100_000_000, 999_999_999)}")
+            elif choice < 0.8:
+                book.delete(self.names.pop(self.rng.randrange(len(self.names))))
+            elif choice < 0.9999:
+                title = f"note{self.number}x{self.rng.randrange(100)}"
+                if title in book.notes:
+                    book.add_tags_to_note(title, [self.rng.choice(TAGS)])
+                else:
+                    book.add_note(title, "text", [self.rng.choice(TAGS)])
+            else:
+                book.delete_all()
+
+
+def check_indexes(book: AddressBook) -> list[str]:
+    """Returns the ways in which the indexes disagree with the records."""
+    problems = []
+    book.build_indexes()
+    if len(book.name_index) != len(book.data):
+        problems.append(f"name index has {len(book.name_index)} names for {len(book.data)} records")
+    phones = {(phone.value, record.name.value) for record in book.data.values() for phone in record.phones}
+    indexed = {(phone, name.value) for phone, names in book.phone_index.names.items() for name in names}
+    if indexed != phones:
+        problems.append(f"phone index has {len(indexed)} phones of contacts, the records {len(phones)}")
+    counts = {}
+    for note in book.notes.values():
+        for tag in set(note.tags):
+            counts[tag] = counts.get(tag, 0) + 1
+    if book.tag_counts() != counts:
+        problems.append("tag counts disagree with the notes")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--contacts", type=int, default=20_000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--switch-interval", type=float, default=1e-5, help="sys.setswitchinterval, small values interleave more")
+    parser.add_argument("--unsafe", action="store_true", help="share the bare book without locks")
+    options = parser.parse_args()
+
+    book = AddressBook(build_records(options.contacts))
+    shared = Unsafe(book) if options.unsafe else ConcurrentAddressBook(book)
+
+    start = time.perf_counter()
+    snapshot = shared.snapshot() if not options.unsafe else None
+    snapshot_ms = (time.perf_counter() - start) * 1000 if snapshot is not None else 0.0
+
+    sys.setswitchinterval(options.switch_interval)
+    deadline = time.perf_counter() + options.seconds
+    workers = [Worker(number, shared, deadline, options.write_ratio) for number in range(options.threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    errors = [error for worker in workers for error in worker.errors]
+    with nullcontext() if options.unsafe else shared.read():
+        errors += check_indexes(book)
+
+    reads = sum(worker.reads for worker in workers)
+    writes = sum(worker.writes for worker in workers)
+    scans = sum(worker.scans for worker in workers)
+    print(f"{options.threads} threads, {options.seconds:.0f}s, {'unsafe' if options.unsafe else 'locked'}")
+    print(f"reads: {reads / options.seconds:,.0f}/s, writes: {writes / options.seconds:,.0f}/s, scans: {scans}")
+    print(f"snapshot of {options.contacts} contacts: {snapshot_ms:.1f} ms, contacts now: {len(book.data)}")
+    print(f"errors: {len(errors)}")
+    for error in sorted(set(errors))[:10]:
+        print(f"  {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Cooperative cancellation of long-running commands with Ctrl-C."""
+
+import threading
+
+_cancelled = threading.Event()
+
+
+class CommandCancelled(Exception):
+    """Raised inside a command that was cancelled."""
+
+
+def cancel_command():
+    """Asks the running command to stop at its next check."""
+    _cancelled.set()
+
+
+def reset_cancellation():
+    """Clears a cancel request before the next command starts."""
+    _cancelled.clear()
+
+
+def check_cancelled():
+    """Raises CommandCancelled if the running command was asked to stop.
+
+    Long loops call this between items, where the book is consistent.
+    """
+    if _cancelled.is_set():
+        raise CommandCancelled("Command cancelled.")
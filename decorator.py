@@ -1,3 +1,17 @@
+import stats
+
+_raise_input_errors = False
+
+
+def raise_input_errors():
+    """Makes decorated handlers raise input errors instead of printing them.
+
+    Batch mode uses this to count failed lines.
+    """
+    global _raise_input_errors
+    _raise_input_errors = True
+
+
 def input_error_decorator_factory(message="Enter the arguments for the command"):
     """A factory for creating input error decorators."""
 
@@ -6,11 +20,59 @@ def input_error_decorator_factory(message="Enter the arguments for the command")
             try:
                 return func(*args, **kwargs)
             except (ValueError, IndexError, KeyError) as err:
+                if _raise_input_errors:
+                    raise
+                stats.mark_failed()
                 print(f"Error: {err}")
 
-            except TypeError:
+            except TypeError as err:
+                if _raise_input_errors:
+                    raise ValueError(message) from err
+                stats.mark_failed()
                 print(f"Invalid Command: {message}")
 
         return inner
 
     return input_error
+
+
+def journaled(func):
+    """Counts every call of a mutating handler and appends it to the journal of its book.
+
+    The book is always the last positional argument. The handler makes its change
+    through the function of the same name in ``operations``, which replay calls for
+    the entry, so failed calls are logged too: replay fails in the same way.
+    """
+    # Imported here: models import this module for ``instrumented``.
+    from operations import OPERATIONS
+
+    if func.__name__ not in OPERATIONS:
+        raise TypeError(f"{func.__name__} has no operation to replay it with")
+
+    def inner(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            *params, book = args
+            book.changes += 1
+            if book.journal is not None:
+                book.journal.append(func.__name__, *params)
+
+    return inner
+
+
+def instrumented(name: str):
+    """Records the calls, errors and latency of the decorated function under ``name``.
+
+    Every registered command is wrapped with it; see the stats command.
+    """
+
+    def decorator(func):
+        def inner(*args, **kwargs):
+            with stats.measure(name):
+                return func(*args, **kwargs)
+
+        inner.__name__ = func.__name__
+        return inner
+
+    return decorator
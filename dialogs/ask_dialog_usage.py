@@ -1,15 +1,15 @@
 """This module contains the function to show a button dialog."""
 
-from prompt_toolkit.shortcuts import button_dialog
 
-
-def ask_dialog_usage():
+async def ask_dialog_usage():
     """Show button dialog."""
-    return button_dialog(
+    from prompt_toolkit.shortcuts import button_dialog
+
+    return await button_dialog(
         title="Welcome to the address book bot",
         text="Do you want to enable command selection dialog?",
         buttons=[
             ("Yes", True),
             ("No", False),
         ],
-    ).run()
+    ).run_async()
@@ -1,12 +1,96 @@
-"""This module contains a function to print text with color."""
+"""This module contains functions to print text and listings with color."""
 
-from prompt_toolkit import print_formatted_text
-from prompt_toolkit.formatted_text import FormattedText
+import shutil
+import sys
+
+from cancellation import check_cancelled
 from models import Colors
 
-_print = print_formatted_text
+SEPARATOR = "-----------------------"
+
+# Plain listings are joined into writes of about this many characters.
+CHUNK_SIZE = 64 * 1024
+
+
+def _print_formatted(text: str, color: Colors):
+    from prompt_toolkit import print_formatted_text
+    from prompt_toolkit.formatted_text import FormattedText
+
+    print_formatted_text(FormattedText([(color.value, text)]))
+
+
+def _print_plain(text: str, color: Colors):
+    print(text)
+
+
+_print = _print_formatted
+
+
+def use_plain_output():
+    """Prints text as plain lines from now on, without colors or terminal rendering."""
+    global _print
+    _print = _print_plain
 
 
 def print_text(text: str, color: Colors = Colors.PRIMARY):
     """Prints text with color."""
-    _print(FormattedText([(color.value, text)]))
+    _print(text, color)
+
+
+def _write_plain(records, separator: str) -> int:
+    """Writes records as plain text in large chunks."""
+    write = sys.stdout.write
+    chunk = []
+    size = 0
+    count = 0
+    for count, record in enumerate(records, start=1):
+        check_cancelled()
+        text = f"{separator}\n{record}\n"
+        chunk.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            write("".join(chunk))
+            chunk.clear()
+            size = 0
+    write("".join(chunk))
+    sys.stdout.flush()
+    return count
+
+
+def _write_pages(records, separator: str, color: Colors) -> int:
+    """Renders one terminal page at a time and asks before rendering the next one."""
+    from prompt_toolkit import print_formatted_text, prompt
+    from prompt_toolkit.formatted_text import FormattedText
+
+    page_lines = max(shutil.get_terminal_size().lines - 1, 2)
+    records = iter(records)
+    record = next(records, None)
+    count = 0
+    while record is not None:
+        fragments = []
+        lines = 0
+        while record is not None and (lines == 0 or lines < page_lines):
+            check_cancelled()
+            text = f"{record}\n"
+            fragments.append((color.value, f"{separator}\n"))
+            fragments.append(("", text))
+            lines += 1 + text.count("\n")
+            count += 1
+            record = next(records, None)
+
+        print_formatted_text(FormattedText(fragments), end="")
+        if record is not None and prompt("-- More -- (Enter: next page, q: stop) ").strip().lower() == "q":
+            break
+    return count
+
+
+def print_records(records, separator: str = SEPARATOR, color: Colors = Colors.INFO) -> int:
+    """Prints records, each after a separator line, and returns how many were printed.
+
+    Records are rendered lazily. On a terminal they are paged, with one styled write
+    per page; otherwise, and in plain output mode, they are written as plain text in
+    large chunks.
+    """
+    if _print is _print_plain or not sys.stdout.isatty():
+        return _write_plain(records, separator)
+    return _write_pages(records, separator, color)
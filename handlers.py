@@ -1,33 +1,84 @@
 """This module contains functions for handling user input and address book operations."""
 
-from models import CommandsDescription
-from models import AddressBook, Record, Commands, commands_config, Colors, Email
-from decorator import input_error_decorator_factory
-from dialogs.print_text import print_text
+import calendar
+import datetime
+import time
+from functools import partial
+from itertools import islice
+
+from models import AddressBook, Commands, commands_config, Colors, Email
+from decorator import input_error_decorator_factory, journaled
+from dialogs.print_text import print_text, print_records
+from storage import IMPORT_FORMATS, export_file, import_file
+import operations
+import stats
+
+
+DEFAULT_PAGE_SIZE = 20
+
+# Rejected rows listed after an import; the rest are only counted.
+SHOWN_REJECTED_ROWS = 20
+
+# Ages reported by birthday_stats when none are given.
+MILESTONE_AGES = [30, 40, 50]
+MAX_AGE = 150
+
+
+def split_paging(args: list[str]) -> tuple[list[str], int, int | None]:
+    """Splits --page and --limit off the arguments and returns (args, page, limit).
+
+    The limit is None when neither option is given, i.e. everything is shown.
+    """
+    rest = []
+    options = {}
+    args = iter(args)
+    for arg in args:
+        if arg in ("--page", "--limit"):
+            value = next(args, "")
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"{arg} expects a positive number.")
+            options[arg] = int(value)
+        else:
+            rest.append(arg)
+
+    page = options.get("--page", 1)
+    limit = options.get("--limit", DEFAULT_PAGE_SIZE if "--page" in options else None)
+    return rest, page, limit
+
+
+def print_page(query, page: int, limit: int | None) -> int:
+    """Prints one page of a paginated query and points to the next page if there is one.
+
+    ``query`` takes ``limit`` and ``offset`` and yields lazily, so only the page and
+    one record after it are ever materialized. Returns the number of records printed.
+    """
+    if limit is None:
+        return print_records(query(limit=None, offset=0))
+
+    records = query(limit=limit + 1, offset=(page - 1) * limit)
+    printed = print_records(islice(records, limit))
+    if next(records, None) is not None:
+        print_text(f"Next page: --page {page + 1} --limit {limit}", Colors.INFO)
+    return printed
 
 
 @input_error_decorator_factory(message=commands_config[Commands.ADD])
+@journaled
 def add_contact(name: str, phone: str, book: AddressBook) -> None:
     """Adds a contact to the address book or adds new phone if contact exists."""
-    record = book.find(name, raise_error=False)
-    message = "Contact added." if record is None else "Contact updated."
-
-    if record is None:
-        record = Record(name)
-        book.add_record(record)
-        message = f"{message} \nName: {name}"
-    if phone:
-        added_phone = record.add_phone(phone)
+    created, added_phone = operations.add_contact(name, phone, book)
+    message = f"Contact added. \nName: {name}" if created else "Contact updated."
+    if added_phone:
         message = f"{message} \nPhone: {added_phone}"
 
     print_text(message, Colors.SUCCESS)
 
 
 @input_error_decorator_factory(message=commands_config[Commands.CHANGE])
+@journaled
 def change_contact(name: str, phone: str, new_phone: str, book: AddressBook) -> None:
     """Changes the phone number of a contact."""
-    record = book.find(name)
-    record.edit_phone(phone, new_phone)
+    operations.change_contact(name, phone, new_phone, book)
 
     print(f"Contact updated. \n Old: {phone} \n New: {new_phone}")
 
@@ -41,11 +92,22 @@ def show_phone(name: str, book: AddressBook) -> str:
         print(phone)
 
 
-def find_contacts(book: AddressBook, queries: list[str]):
-    """Shows contacts by search queries."""
-    found = book.find_by_query(queries)
-    if len(found) == 0:
+@input_error_decorator_factory(message=commands_config[Commands.FIND_CONTACTS])
+def find_contacts(args: list[str], book: AddressBook):
+    """Shows contacts by search queries, optionally one page at a time."""
+    queries, page, limit = split_paging(args)
+    if not queries:
+        raise ValueError("Enter at least one search query.")
+    if not print_page(partial(book.iter_by_query, queries), page, limit):
         print_text("No contacts found.", Colors.WARNING)
+
+
+@input_error_decorator_factory(message=commands_config[Commands.FIND_FUZZY])
+def find_fuzzy(name: str, book: AddressBook):
+    """Shows contacts whose names are close to the given name."""
+    found = book.find_fuzzy(name)
+    if len(found) == 0:
+        print_text("No similar contacts found.", Colors.WARNING)
     for record in found:
         print_text("-----------------------", Colors.INFO)
         print(record)
@@ -58,22 +120,19 @@ def show_contact(name: str, book: AddressBook) -> str:
     print(record)
 
 
-def show_all(book) -> dict:
-    """Shows all contacts in the address book."""
-    if len(book.data) == 0:
+@input_error_decorator_factory(message=commands_config[Commands.ALL])
+def show_all(args: list[str], book: AddressBook):
+    """Shows all contacts in the address book, optionally one page at a time."""
+    _, page, limit = split_paging(args)
+    if not print_page(book.iter_records, page, limit):
         print_text("No contacts found.", Colors.WARNING)
-        return
-
-    for record in book.data.values():
-        print_text("-----------------------", Colors.INFO)
-        print(record)
 
 
 @input_error_decorator_factory(message=commands_config[Commands.ADD_BIRTHDAY])
+@journaled
 def add_birthday(name: str, birthday: str, book: AddressBook):
     """Adds a birthday to a contact."""
-    record = book.find(name)
-    record.add_birthday(birthday)
+    operations.add_birthday(name, birthday, book)
     print_text("Birthday added.", Colors.SUCCESS)
 
 
@@ -88,8 +147,9 @@ def show_birthday(name: str, book: AddressBook):
 
 
 @input_error_decorator_factory(message=commands_config[Commands.BIRTHDAYS])
-def birthdays(book, upcoming_days=7):
+def birthdays(args, book):
     """Shows upcoming birthdays."""
+    upcoming_days = int(args[0]) if args else 7
     upcoming_birthdays = book.get_upcoming_birthdays(upcoming_days)
     if len(upcoming_birthdays) == 0:
         print_text("No upcoming birthdays.")
@@ -98,26 +158,55 @@ def birthdays(book, upcoming_days=7):
         print_text(f"{item['name']}: {item['congratulation_date']}", Colors.INFO)
 
 
+@input_error_decorator_factory(message=commands_config[Commands.BIRTHDAY_STATS])
+def birthday_stats(args: list[str], book: AddressBook):
+    """Shows birthday and age aggregates and the milestone birthdays of the current quarter."""
+    if not all(arg.isdigit() and int(arg) <= MAX_AGE for arg in args):
+        raise ValueError(f"Ages must be whole numbers from 0 to {MAX_AGE}.")
+    ages = [int(arg) for arg in args] or MILESTONE_AGES
+
+    today = datetime.date.today()
+    summary = book.birthday_stats(today)
+    if not summary["contacts"]:
+        print_text("No birthdays set.")
+        return
+    print_text(
+        f"Contacts with a birthday: {summary['contacts']}, average age {summary['average_age']:.1f}", Colors.INFO
+    )
+    months = ", ".join(
+        f"{calendar.month_abbr[month]} {count}" for month, count in enumerate(summary["by_month"], start=1)
+    )
+    print(f"By month: {months}")
+    print(f"By age: {', '.join(f'{decade}-{decade + 9}: {count}' for decade, count in summary['by_age'].items())}")
+
+    first_month = (today.month - 1) // 3 * 3 + 1
+    start = datetime.date(today.year, first_month, 1)
+    end = datetime.date(today.year, first_month + 2, calendar.monthrange(today.year, first_month + 2)[1])
+    milestones = book.get_milestone_birthdays(ages, start, end)
+    print_text(
+        f"Turning {', '.join(map(str, ages))} from {start:%d.%m.%Y} to {end:%d.%m.%Y}: {len(milestones)}", Colors.INFO
+    )
+    for item in milestones:
+        print(f"{item['name']} turns {item['age']} on {item['date']}, congratulate on {item['congratulation_date']}")
+
+
 @input_error_decorator_factory(message="Invalid command. Usage: add_email <name> <email>")
+@journaled
 def add_email(name: str, email: str, book: AddressBook):
-    record = book.find(name)
-    record.add_email(email)
+    operations.add_email(name, email, book)
     print(f"Email added for {name}: {email}")
 
 
 @input_error_decorator_factory(message="Invalid command. Usage: edit_email <name> <new_email>")
+@journaled
 def edit_email(name: str, new_email: str, book: AddressBook):
-    record = book.find(name)
-    record.edit_email(new_email)
+    operations.edit_email(name, new_email, book)
     print(f"Email updated for {name}: {new_email}")
 
 
 @input_error_decorator_factory(message="Invalid command. Usage: search_by_email <email>")
 def search_by_email(email: str, book: AddressBook):
-    found_records = []
-    for record in book.data.values():
-        if record.email and record.email.value == email:
-            found_records.append(record)
+    found_records = book.find_by_email(email)
 
     if found_records:
         print("Found contacts:")
@@ -127,64 +216,76 @@ def search_by_email(email: str, book: AddressBook):
         print("No contacts found with the provided email.")
 
 
+@input_error_decorator_factory(message=commands_config[Commands.SEARCH_BY_DOMAIN])
+def search_by_domain(domain: str, book: AddressBook):
+    """Shows contacts with an email at the domain or its subdomains."""
+    found_records = book.find_by_domain(domain)
+
+    if found_records:
+        print(f"Found contacts at {domain}:")
+        for record in found_records:
+            print(record)
+    else:
+        print("No contacts found with the provided domain.")
+
+
 @input_error_decorator_factory(message="Invalid command. Usage: remove_email <name>")
+@journaled
 def remove_email(name: str, book: AddressBook):
-    record = book.find(name)
-    record.remove_email()
+    operations.remove_email(name, book)
     print(f"Email removed for {name}")
 
 
 @input_error_decorator_factory(message=commands_config[Commands.ADD_ADDRESS])
+@journaled
 def add_address(name: str, street: str, city: str, postal_code: str, country: str, book: AddressBook):
     """Adds an address to a contact."""
-    record = book.find(name)
-    address = record.add_address(street, city, postal_code, country)
+    address = operations.add_address(name, street, city, postal_code, country, book)
     print(f"Address added: {address}")
 
 
-def help_info() -> dict:
+def help_info(book: AddressBook = None) -> dict:
     """Show list of available commands."""
-    for command in CommandsDescription.get_commands_description():
-        print_text(command, Colors.INFO)
+    for command, config in commands_config.items():
+        print_text(f"'{command}' - {config}", Colors.INFO)
 
 
 @input_error_decorator_factory(message=commands_config[Commands.EDIT_ADDRESS])
+@journaled
 def edit_address(name: str, street: str, city: str, postal_code: str, country: str, book: AddressBook):
     """Edits the address of a contact."""
-    record = book.find(name)
-    address = record.edit_address(street, city, postal_code, country)
+    address = operations.edit_address(name, street, city, postal_code, country, book)
     print(f"Address updated: {address}")
 
 
 @input_error_decorator_factory(message=commands_config[Commands.DELETE_ADDRESS])
+@journaled
 def delete_address(name: str, book: AddressBook):
     """Deletes the address of a contact."""
-    record = book.find(name)
-    record.delete_address()
+    operations.delete_address(name, book)
     print(f"Address deleted for {name}")
 
 
 @input_error_decorator_factory(message="Invalid command. Usage: delete <name>")
+@journaled
 def delete_contact(name: str, book: AddressBook):
     """Deletes a contact from the address book."""
-    book.delete(name)
+    operations.delete_contact(name, book)
     print(f"Contact {name} deleted.")
 
 
+@journaled
 def delete_all_contacts(book: AddressBook):
     """Deletes all contacts from the address book."""
-    book.data.clear()
+    operations.delete_all_contacts(book)
     print("All contacts have been deleted.")
 
 
 @input_error_decorator_factory()
+@journaled
 def add_note(args, book):
     """Adds a note to the address book."""
-    if len(args) < 2:
-        raise IndexError("Invalid command. Usage: add_note <title> <text>")
-    title, *text = args
-    fixed_text = " ".join(text)
-    print(book.add_note(title, fixed_text))
+    print(operations.add_note(args, book))
 
 
 @input_error_decorator_factory()
@@ -197,59 +298,161 @@ def find_note_by_title(args, book):
 
 
 @input_error_decorator_factory(message=commands_config[Commands.EDIT_NOTE])
+@journaled
 def edit_note_text(args, book):
     """Edits a note by title."""
-    if len(args) < 2:
-        raise IndexError("Invalid command. Usage: edit_note <title> <text>")
-    title, *new_text = args
-    fixed_text = " ".join(new_text)
-    print(book.edit_note_text(title, fixed_text))
+    print(operations.edit_note_text(args, book))
 
 
 @input_error_decorator_factory()
+@journaled
 def delete_note_by_title(args, book):
     """Deletes a note by title."""
-    if len(args) < 1:
-        raise IndexError("Invalid command. Usage: delete_note <title>")
-    (title,) = args
-    print(book.delete_note_by_title(title))
+    print(operations.delete_note_by_title(args, book))
+
+
+@input_error_decorator_factory(message=commands_config[Commands.SHOW_NOTES])
+def show_notes(args: list[str], book: AddressBook):
+    """Shows all notes in the address book, optionally one page at a time."""
+    _, page, limit = split_paging(args)
+    if not print_page(book.iter_notes, page, limit):
+        print("No notes found.")
 
 
-def show_notes(book):
-    """Shows all notes in the address book."""
-    if len(book.notes) > 0:
-        for note in book.notes.values():
-            print("-----------------------")
+@input_error_decorator_factory()
+def search_notes(args, book):
+    """Finds notes by words in their title and text, best matches first."""
+    if len(args) < 1:
+        raise IndexError('Invalid command. Usage: search_notes <word1> <word2> "<phrase>" ...')
+    found_notes = book.search_notes(" ".join(args))
+    if found_notes:
+        for note, score in found_notes:
+            print_text(f"----------------------- score: {score:.2f}", Colors.INFO)
             print(note)
     else:
         print("No notes found.")
 
 
 @input_error_decorator_factory()
+@journaled
 def add_tags_to_note(args, book):
-    if len(args) < 2:
-        raise IndexError("Invalid command. Usage: add_tags_to_note <title> <tag1> <tag2> ...")
-    title, *tags = args
-    print(book.add_tags_to_note(title, tags))
+    print(operations.add_tags_to_note(args, book))
 
 
 @input_error_decorator_factory()
+@journaled
 def remove_tags_from_note(args, book):
-    if len(args) < 2:
-        raise IndexError("Invalid command. Usage: remove_tags_from_note <title> <tag1> <tag2> ...")
-    title, *tags = args
-    print(book.remove_tags_from_note(title, tags))
+    print(operations.remove_tags_from_note(args, book))
 
 
 @input_error_decorator_factory()
 def find_notes_by_tags(args, book):
+    """Finds notes by tags: 'a b' needs both, 'a|b' needs either, '-a' excludes a."""
     if len(args) < 1:
-        raise IndexError("Invalid command. Usage: find_notes_by_tags <tag1> <tag2> ...")
-    tags = args
-    found_notes = book.find_notes_by_tags(tags)
+        raise IndexError("Invalid command. Usage: find_notes_by_tags <tag1> <tag2|tag3> <-tag4> ...")
+    groups = [arg.split("|") for arg in args if not arg.startswith("-")]
+    excluded = [arg[1:] for arg in args if arg.startswith("-")]
+    found_notes = book.query_notes_by_tags(groups, excluded)
     if found_notes:
-        for note in found_notes:
-            print("-----------------------")
-            print(note)
+        print_records(found_notes)
     else:
         print("No notes found with the provided tags.")
+
+
+def show_tags(book):
+    """Shows how many notes carry each tag."""
+    tag_counts = book.tag_counts()
+    if not tag_counts:
+        print("No tags found.")
+        return
+    for tag, count in sorted(tag_counts.items(), key=lambda item: (-item[1], item[0])):
+        print_text(f"{tag}: {count}", Colors.INFO)
+
+
+@input_error_decorator_factory(message=commands_config[Commands.IMPORT])
+def import_contacts(args: list[str], book: AddressBook):
+    """Imports contacts from a file and reports the rejected rows."""
+    filename, *options = args
+    file_format = None
+    if options:
+        formats = set(IMPORT_FORMATS.values())
+        if len(options) != 2 or options[0] != "--format" or options[1] not in formats:
+            raise ValueError(f"--format expects one of: {', '.join(sorted(formats))}")
+        file_format = options[1]
+
+    start = time.perf_counter()
+    try:
+        result = import_file(book, filename, file_format)
+    except OSError as err:
+        raise ValueError(f"Cannot read {filename}: {err.strerror or err}") from err
+    elapsed = time.perf_counter() - start
+
+    notes = f", {result.notes} notes" if result.notes else ""
+    print_text(
+        f"Imported {result.imported} contacts ({result.added} added, {result.updated} updated){notes} "
+        f"in {elapsed:.2f}s, {len(result.rejected)} rows rejected.",
+        Colors.SUCCESS,
+    )
+    for line_number, reason in result.rejected[:SHOWN_REJECTED_ROWS]:
+        print_text(f"line {line_number}: {reason}", Colors.WARNING)
+    if len(result.rejected) > SHOWN_REJECTED_ROWS:
+        print_text(f"... and {len(result.rejected) - SHOWN_REJECTED_ROWS} more", Colors.WARNING)
+
+
+@input_error_decorator_factory(message=commands_config[Commands.EXPORT])
+def export_contacts(args: list[str], book: AddressBook):
+    """Exports contacts, optionally only the ones found by search queries, to a file."""
+    file_format, filename, *queries = args
+
+    start = time.perf_counter()
+    try:
+        result = export_file(book, file_format.lower(), filename, queries)
+    except OSError as err:
+        raise ValueError(f"Cannot write {filename}: {err.strerror or err}") from err
+    elapsed = time.perf_counter() - start
+
+    notes = f" and {result.notes} notes" if result.notes else ""
+    print_text(f"Exported {result.contacts} contacts{notes} to {filename} in {elapsed:.2f}s.", Colors.SUCCESS)
+
+
+@input_error_decorator_factory(message=commands_config[Commands.STATS])
+def show_stats(args: list[str], book: AddressBook):
+    """Shows the per-command statistics, resets or dumps them, or switches profiling of a command."""
+    action, *params = args or ["show"]
+    if action == "reset" and not params:
+        stats.reset_stats()
+        print_text("Statistics reset.", Colors.SUCCESS)
+        return
+    if action == "dump" and len(params) == 1:
+        try:
+            stats.dump_stats(params[0])
+        except OSError as err:
+            raise ValueError(f"Cannot write {params[0]}: {err.strerror or err}") from err
+        print_text(f"Statistics written to {params[0]}.", Colors.SUCCESS)
+        return
+    if action == "profile" and len(params) == 2:
+        command, mode = params
+        if not Commands.is_valid(command):
+            raise ValueError(f"Invalid command. {command} is not found.")
+        stats.set_profiling(command, None if mode == "off" else mode)
+        state = "off" if mode == "off" else f"on with {mode}, output goes to stderr"
+        print_text(f"Profiling of {command} {state}.", Colors.SUCCESS)
+        return
+    if action != "show" or params:
+        raise ValueError(f"Usage: {commands_config[Commands.STATS].usage_message}")
+
+    report = stats.report()
+    if not report:
+        print("No commands run yet.")
+        return
+    print_text(
+        f"{'command':<20} {'calls':>7} {'errors':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>8}",
+        Colors.INFO,
+    )
+    for name, item in report.items():
+        print(
+            f"{name:<20} {item['calls']:>7} {item['errors']:>6} {item['mean_ms']:>9.2f} {item['p50_ms']:>9.2f} "
+            f"{item['p95_ms']:>9.2f} {item['p99_ms']:>9.2f} {item['total_ms'] / 1000:>8.2f}"
+        )
+    for name, mode in stats.profiled().items():
+        print_text(f"{name} is profiled with {mode}.", Colors.INFO)
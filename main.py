@@ -1,26 +1,39 @@
 """Main module of the program."""
 
+import argparse
+import io
+import json
+import os
 import pickle
-from prompt_toolkit import prompt
-import handlers
-from dialogs import ask_command, ask_dialog_usage, print_text
-from models import Commands, AddressBook, Colors
-
-
+import socket
+import stat
+import sys
+import time
+from contextlib import nullcontext, redirect_stdout
+from cancellation import CommandCancelled, cancel_command, reset_cancellation
+from decorator import instrumented, raise_input_errors
+from dialogs import ask_command, ask_dialog_usage, print_text, use_plain_output
+from models import Commands, AddressBook, Colors, get_command_config
+from stats import dump_stats
+from storage import Journal, SQLiteAddressBook, paused_gc
+
+
+@instrumented("save_data")
 def save_data(book, filename="addressbook.pkl"):
     """Saves the address book to a file."""
     with open(filename, "wb") as f:
         pickle.dump(book, f)
 
 
+@instrumented("load_data")
 def load_data(filename="addressbook.pkl"):
     """Loads the address book from a file."""
     try:
-        with open(filename, "rb") as f:
+        with open(filename, "rb") as f, paused_gc():
             data = pickle.load(f)
             contacts = data.get("contacts", {})
             notes = data.get("notes", {})
-            book = AddressBook(contacts, notes)
+            book = AddressBook(contacts, notes, note_search=data.get("note_search"))
             return book
     except FileNotFoundError:
         return AddressBook()
@@ -33,21 +46,247 @@ def parse_input(user_input: str):
     return cmd, *args
 
 
-def main():
-    """Main function of the program."""
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Address book bot")
+    parser.add_argument(
+        "--storage",
+        choices=["pickle", "journal", "sqlite"],
+        default="pickle",
+        help=(
+            "pickle: save the whole book on exit; journal: append every change to addressbook.journal; "
+            "sqlite: keep the book in addressbook.db and load records on demand"
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the commands of FILE ('-' for stdin) one per line and exit",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="serve the book to local clients over a Unix socket at SOCKET, one JSON request per line",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="in batch mode, print only failures and the summary",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="write the calls, errors and latency percentiles of every command to FILE as JSON on exit",
+    )
+    return parser.parse_args(argv)
+
+
+def open_book(storage: str) -> AddressBook:
+    """Opens the address book with the selected storage engine."""
+    if storage == "journal":
+        return Journal().load()
+    if storage == "sqlite":
+        return SQLiteAddressBook.open()
+    return load_data()
+
+
+def book_snapshot(book: AddressBook) -> dict:
+    """Returns the data saved to addressbook.pkl."""
+    return {"contacts": book.data, "notes": book.notes, "note_search": book.note_search}
+
+
+def close_book(book: AddressBook, storage: str):
+    """Persists and closes the address book."""
+    if storage == "journal":
+        book.journal.close()
+    elif storage == "sqlite":
+        book.close()
+    else:
+        save_data(book_snapshot(book), "addressbook.pkl")
+
+
+def checkpoint(book: AddressBook, storage: str):
+    """Persists the address book without closing it."""
+    if storage == "journal":
+        book.journal.sync()
+    elif storage == "sqlite":
+        book.commit()
+    else:
+        save_data(book_snapshot(book), "addressbook.pkl.tmp")
+        os.replace("addressbook.pkl.tmp", "addressbook.pkl")
+
+
+class BatchResult:
+    """Class representing the outcome of a batch run."""
+
+    def __init__(self):
+        self.commands = 0
+        self.failures: list[tuple[int, str]] = []
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Commands per second."""
+        return self.commands / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def exit_status(self) -> int:
+        """Process exit status: 1 when any line failed."""
+        return 1 if self.failures else 0
+
+    def __str__(self):
+        return (
+            f"{self.commands} commands, {len(self.failures)} failed "
+            f"in {self.elapsed:.3f}s ({self.throughput:,.0f} commands/sec)"
+        )
+
+
+def run_batch(lines, book: AddressBook, flush_every: int = 10_000) -> BatchResult:
+    """Runs one command per line, reporting failed lines to stderr.
+
+    Blank lines and lines starting with '#' are skipped; 'exit' or 'close' stops the
+    batch. All mutations form one journal transaction, and SQLite write-back happens
+    every ``flush_every`` commands within a single database transaction.
+    """
+    result = BatchResult()
+    stop_commands = {Commands.EXIT.value, Commands.CLOSE.value}
+    flush = book.flush if isinstance(book, SQLiteAddressBook) else None
+    start = time.perf_counter()
+
+    def fail(line_number: int, error: str):
+        result.failures.append((line_number, error))
+        print(f"line {line_number}: {error}", file=sys.stderr)
+
+    with book.journal.transaction() if book.journal is not None else nullcontext():
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            command, *args = parse_input(line)
+            config = get_command_config(command)
+            if config is None:
+                fail(line_number, f"Invalid command. {command} is not found.")
+                continue
+            if command in stop_commands:
+                break
+
+            result.commands += 1
+            if not config.accepts(args):
+                fail(line_number, f"Invalid Command: {config}")
+                continue
+            try:
+                config.run(args, book)
+            except (ValueError, IndexError, KeyError) as err:
+                fail(line_number, str(err))
+
+            if flush is not None and result.commands % flush_every == 0:
+                flush()
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def batch_main(options, book: AddressBook) -> int:
+    """Runs the batch file given on the command line and returns the exit status."""
+    use_plain_output()
+    raise_input_errors()
+
+    with open(options.batch, encoding="utf-8") if options.batch != "-" else nullcontext(sys.stdin) as lines:
+        with open(os.devnull, "w") if options.quiet else nullcontext(sys.stdout) as out, redirect_stdout(out):
+            result = run_batch(lines, book)
+
+    print(f"Batch: {result}", file=sys.stderr)
+    return result.exit_status
+
 
-    book = load_data()
-    if book is None:
-        book = AddressBook()
+CHECKPOINT_INTERVAL = 60.0
 
-    dialog_selection_enabled = ask_dialog_usage()
 
+def execute(config, args: list[str], book: AddressBook, storage: str, commit: bool = True):
+    """Runs a command and keeps the storage up to date.
+
+    With ``commit=False`` SQLite changes are left for the caller to commit.
+    """
+    reset_cancellation()
+    try:
+        config.run(args, book)
+    finally:
+        if storage == "journal":
+            book.journal.maybe_compact(book)
+        elif storage == "sqlite" and commit:
+            book.commit()
+
+
+async def checkpoint_periodically(executor, book: AddressBook, storage: str, interval: float = CHECKPOINT_INTERVAL):
+    """Saves the book every ``interval`` seconds if a command changed it."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    saved = book.changes
+    while True:
+        await asyncio.sleep(interval)
+        if book.changes == saved:
+            continue
+        saved = book.changes
+        try:
+            await loop.run_in_executor(executor, checkpoint, book, storage)
+        except OSError as err:
+            print_text(f"Checkpoint failed: {err}", Colors.WARNING)
+
+
+async def run_command(executor, config, args: list[str], book: AddressBook, storage: str):
+    """Runs a command on the book thread; Ctrl-C asks it to stop at its next check."""
+    import asyncio
+    import signal
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, cancel_command)
+    except (NotImplementedError, RuntimeError):
+        # No signal handlers on Windows: Ctrl-C interrupts the event loop as before.
+        pass
+
+    try:
+        await loop.run_in_executor(executor, execute, config, args, book, storage)
+    except (CommandCancelled, KeyboardInterrupt):
+        print_text("Command cancelled.", Colors.WARNING)
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def repl(storage: str):
+    """Runs the interactive session.
+
+    Everything that touches the book runs in order on one worker thread: loading,
+    index building, commands, checkpoints and closing. The event loop only reads
+    input and waits, so the prompt stays responsive, SQLite connections stay in the
+    thread that opened them, and commands never run concurrently.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="book")
+    # Loading and deferred index building overlap with the first dialog and prompt.
+    opening = executor.submit(open_book, storage)
+    executor.submit(lambda: opening.result().build_indexes())
+    loading = asyncio.wrap_future(opening)
+
+    from prompt_toolkit import PromptSession
+
+    session = PromptSession()
+    checkpoints = None
     try:
+        dialog_selection_enabled = await ask_dialog_usage()
         while True:
             if dialog_selection_enabled:
-                command, args = ask_command()
+                command, args = await ask_command()
             else:
-                user_input = prompt("Enter command: ")
+                user_input = await session.prompt_async("Enter command: ")
                 try:
                     if not user_input:
                         raise ValueError("No command entered.")
@@ -57,112 +296,254 @@ def main():
                     continue
 
             # Check if command is valid
-            if not Commands.is_valid(command):
+            config = get_command_config(command)
+            if config is None:
                 print_text(f"Invalid command. {command} is not found.", Colors.ERROR)
                 print_text(f"Existed commands: {Commands.get_commands()}", Colors.INFO)
                 continue
 
-            elif command == Commands.ADD.value:
-                handlers.add_contact(*args, book)
-
-            elif command == Commands.CHANGE.value:
-                handlers.change_contact(*args, book)
+            if command in [Commands.EXIT.value, Commands.CLOSE.value]:
+                print_text("Goodbye!", Colors.SUCCESS)
+                break
 
-            elif command == Commands.PHONE.value:
-                handlers.show_phone(*args, book)
+            book = await loading
+            if checkpoints is None:
+                checkpoints = asyncio.create_task(checkpoint_periodically(executor, book, storage))
 
-            elif command == Commands.ALL.value:
-                handlers.show_all(book)
+            if not config.accepts(args):
+                print_text(f"Invalid Command: {config}", Colors.ERROR)
+            else:
+                await run_command(executor, config, args, book, storage)
 
-            elif command == Commands.ADD_BIRTHDAY.value:
-                handlers.add_birthday(*args, book)
+            if dialog_selection_enabled:
+                print_text("Press Enter when you are ready to continue...", Colors.INFO)
+                await session.prompt_async()
 
-            elif command == Commands.SHOW_CONTACT.value:
-                handlers.show_contact(*args, book)
+    except (ValueError, IndexError, KeyError) as err:
+        print(f"Error: {err}")
 
-            elif command == Commands.FIND_CONTACTS.value:
-                handlers.find_contacts(book, args)
+    except (KeyboardInterrupt, EOFError):
+        print("Goodbye!")
 
-            elif command == Commands.SHOW_BIRTHDAY.value:
-                handlers.show_birthday(*args, book)
+    finally:
+        if checkpoints is not None:
+            checkpoints.cancel()
+        await loop.run_in_executor(executor, close_book, await loading, storage)
+        executor.shutdown()
 
-            elif command == Commands.BIRTHDAYS.value:
-                handlers.birthdays(book, *args)
 
-            elif command == Commands.ADD_EMAIL.value:
-                handlers.add_email(*args, book)
+# Lines of a server request may hold whole imports, so allow more than asyncio's 64 KiB.
+REQUEST_LIMIT = 16 * 1024 * 1024
 
-            elif command == Commands.SEARCH_BY_EMAIL.value:
-                handlers.search_by_email(*args, book)
 
-            elif command == Commands.CHANGE_EMAIL.value:
-                handlers.edit_email(*args, book)
+def run_request(request, book: AddressBook, storage: str) -> dict:
+    """Runs one server request and returns its response.
 
-            elif command == "remove_email":
-                handlers.remove_email(*args, book)
+    A request is a JSON object ``{"id": ..., "command": "add", "args": ["Ann", "0501234567"]}``;
+    the response echoes the id and carries either ``ok: true`` and the printed ``output``
+    or ``ok: false`` and an ``error``. SQLite changes are not committed here, see GroupCommit.
+    """
+    response = {"id": request.get("id") if isinstance(request, dict) else None}
+    command = request.get("command") if isinstance(request, dict) else None
+    args = request.get("args", []) if isinstance(request, dict) else None
+    if not isinstance(command, str) or not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        return {**response, "ok": False, "error": "Invalid request: expected a command and a list of string args."}
 
-            elif command == Commands.HELP.value:
-                handlers.help_info()
+    config = get_command_config(command.lower())
+    if config is None:
+        return {**response, "ok": False, "error": f"Invalid command. {command} is not found."}
+    if not config.accepts(args):
+        return {**response, "ok": False, "error": f"Invalid Command: {config}"}
 
-            elif command == Commands.ADD_NOTE.value:
-                handlers.add_note(args, book)
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            execute(config, args, book, storage, commit=False)
+    except (ValueError, IndexError, KeyError, CommandCancelled) as err:
+        return {**response, "ok": False, "error": str(err), "output": output.getvalue()}
+    return {**response, "ok": True, "output": output.getvalue()}
 
-            elif command == Commands.FIND_NOTE.value:
-                handlers.find_note_by_title(args, book)
 
-            elif command == Commands.EDIT_NOTE.value:
-                handlers.edit_note_text(args, book)
+class GroupCommit:
+    """Class committing a SQLite book once for all the requests that changed it meanwhile.
 
-            elif command == Commands.DELETE_NOTE.value:
-                handlers.delete_note_by_title(args, book)
+    A response to a change waits for a commit that covers it, so concurrent clients
+    share commits instead of paying for one each.
+    """
 
-            elif command == Commands.SHOW_NOTES.value:
-                handlers.show_notes(book)
+    def __init__(self, executor, book: SQLiteAddressBook):
+        self.executor = executor
+        self.book = book
+        self.committed = book.changes
+        self.pending = None
 
-            elif command == Commands.ADD_TAGS.value:
-                handlers.add_tags_to_note(args, book)
+    def _commit(self) -> int:
+        changes = self.book.changes
+        self.book.commit()
+        return changes
 
-            elif command == Commands.REMOVE_TAGS.value:
-                handlers.remove_tags_from_note(args, book)
+    async def wait(self, changes: int):
+        """Returns once the first ``changes`` changes of the book are committed."""
+        import asyncio
 
-            elif command == Commands.FIND_BY_TAGS.value:
-                handlers.find_notes_by_tags(args, book)
+        while self.committed < changes:
+            if self.pending is None:
+                self.pending = asyncio.get_running_loop().run_in_executor(self.executor, self._commit)
+            pending = self.pending
+            committed = await pending
+            if self.pending is pending:
+                self.pending = None
+            self.committed = max(self.committed, committed)
 
-            elif command == Commands.ADD_ADDRESS.value:
-                handlers.add_address(*args, book)
 
-            elif command == Commands.EDIT_ADDRESS.value:
-                handlers.edit_address(*args, book)
+async def serve_client(reader, writer, executor, book: AddressBook, storage: str, commits: GroupCommit | None):
+    """Answers the requests of one client in order until it disconnects or sends 'exit'.
 
-            elif command == Commands.DELETE.value:
-                handlers.delete_contact(*args, book)
+    Clients may pipeline: requests already sent wait in the stream buffer while the
+    previous one runs, and responses come back in the order of the requests.
+    """
+    import asyncio
 
-            elif command == Commands.DELETE_ALL.value:
-                handlers.delete_all_contacts(book)
+    loop = asyncio.get_running_loop()
+    stop_commands = {Commands.EXIT.value, Commands.CLOSE.value}
 
-            elif command == Commands.DELETE_ADDRESS.value:
-                handlers.delete_address(*args, book)
+    def run_counted(request) -> tuple[dict, int]:
+        return run_request(request, book, storage), book.changes
 
-            elif command in [Commands.EXIT.value, Commands.CLOSE.value]:
-                print_text("Goodbye!", Colors.SUCCESS)
+    try:
+        while line := await reader.readline():
+            stopping = False
+            try:
+                request = json.loads(line)
+            except ValueError as err:
+                response = {"id": None, "ok": False, "error": f"Invalid request: {err}"}
+            else:
+                stopping = isinstance(request, dict) and str(request.get("command", "")).lower() in stop_commands
+                if stopping:
+                    response = {"id": request.get("id"), "ok": True, "output": ""}
+                else:
+                    response, changes = await loop.run_in_executor(executor, run_counted, request)
+                    if commits is not None:
+                        await commits.wait(changes)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+            if stopping:
                 break
+    except (ConnectionError, ValueError) as err:
+        # ValueError: a line longer than REQUEST_LIMIT.
+        print(f"Client dropped: {err}", file=sys.stderr)
+    finally:
+        writer.close()
 
-            else:
-                print_text("Invalid command.", Colors.ERROR)
 
-            if dialog_selection_enabled:
-                print_text("Press Enter when you are ready to continue...", Colors.INFO)
-                prompt()
+def check_socket_path(path: str):
+    """Makes the path free for the server socket.
 
-    except (ValueError, IndexError, KeyError) as err:
-        print(f"Error: {err}")
+    A socket left behind by a killed server is removed. Raises OSError when the
+    path is anything else, or when a server is still listening there, so the book
+    is never served by two processes and no file is overwritten.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
 
-    except KeyboardInterrupt:
-        print("Goodbye!")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"another server is listening on {path}")
 
+
+async def serve(path: str, storage: str) -> int:
+    """Owns the book and serves it over a Unix socket until SIGINT or SIGTERM.
+
+    Like the REPL, everything that touches the book runs on one worker thread, so
+    requests of concurrent clients are serialized, and the book is checkpointed and
+    saved in one place. Journal entries are written as requests run; SQLite changes
+    are committed before the response is sent.
+    """
+    import asyncio
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        check_socket_path(path)
+    except OSError as err:
+        print(f"Cannot serve on {path}: {err}", file=sys.stderr)
+        return 1
+
+    use_plain_output()
+    raise_input_errors()
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="book")
+    book = await loop.run_in_executor(executor, open_book, storage)
+    await loop.run_in_executor(executor, book.build_indexes)
+
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    clients = set()
+    commits = GroupCommit(executor, book) if storage == "sqlite" else None
+
+    def on_client(reader, writer):
+        client = asyncio.create_task(serve_client(reader, writer, executor, book, storage, commits))
+        clients.add(client)
+        client.add_done_callback(clients.discard)
+
+    server = await asyncio.start_unix_server(on_client, path=path, limit=REQUEST_LIMIT)
+    checkpoints = asyncio.create_task(checkpoint_periodically(executor, book, storage))
+    print(f"Serving the {storage} book on {path}", file=sys.stderr)
+    try:
+        await stopping.wait()
+    finally:
+        server.close()
+        checkpoints.cancel()
+        for client in list(clients):
+            client.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        await loop.run_in_executor(executor, close_book, book, storage)
+        executor.shutdown()
+        os.unlink(path)
+        print("Server stopped.", file=sys.stderr)
+    return 0
+
+
+def main():
+    """Main function of the program."""
+
+    options = parse_args()
+    try:
+        return run(options)
     finally:
-        save_data({"contacts": book.data, "notes": book.notes}, "addressbook.pkl")
+        if options.stats is not None:
+            dump_stats(options.stats)
+
+
+def run(options) -> int | None:
+    """Runs the mode selected on the command line."""
+    if options.batch is not None:
+        book = open_book(options.storage)
+        try:
+            return batch_main(options, book)
+        finally:
+            close_book(book, options.storage)
+
+    import asyncio
+
+    if options.serve is not None:
+        return asyncio.run(serve(options.serve, options.storage))
+    else:
+        asyncio.run(repl(options.storage))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
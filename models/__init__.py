@@ -5,3 +5,5 @@ from .fields import *
 from .record import *
 from .commands import *
 from .colors import *
+from .concurrent_book import *
+from .events import *
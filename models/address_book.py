@@ -1,20 +1,121 @@
 """AddressBook module."""
 
+import calendar
 import datetime
+import sys
 from collections import UserDict
 
 from .fields import Name, Phone, Birthday, Note, Email
 from .record import Record
+from .name_index import NameIndex
+from .phone_index import PhoneIndex
+from .birthday_calendar import BirthdayCalendar
+from .email_index import EmailIndex
+from .events import (
+    EventBus,
+    NoteAdded,
+    NoteEdited,
+    NoteRemoved,
+    RecordAdded,
+    RecordRemoved,
+    RecordsCleared,
+    TagsChanged,
+)
+from .tag_index import TagIndex
+from .pagination import paginate, record_key, note_key
+from .note_search import NoteSearchIndex
 
 
 class AddressBook(UserDict):
-    """Class representing an address book."""
+    """Class representing an address book.
 
-    def __init__(self, contacts=None, notes=None, tags=None):
+    Changes made through its methods and the methods of its records are published
+    to ``events``; the contacts and notes it is created with are not.
+    """
+
+    def __init__(self, contacts=None, notes=None, tags=None, note_search=None):
         super().__init__()
         self.notes = notes if notes else {}
+        self.journal = None
+        self.changes = 0
+        # Set by ConcurrentAddressBook while a writer holds the book: keys of the records
+        # and notes copied since the last snapshot, the others are shared with it.
+        self.copy_on_write: set | None = None
+        self.events = EventBus()
+        self.name_index = NameIndex()
+        self.phone_index = PhoneIndex()
+        self.birthday_calendar = BirthdayCalendar()
+        self.email_index = EmailIndex()
         if contacts:
             self.data.update(contacts)
+            for record in self.data.values():
+                self._index_record(record)
+        self.tag_index = TagIndex(list(self.notes.values()))
+        if note_search is None or not note_search.matches(self.notes):
+            note_search = NoteSearchIndex(self.notes.values())
+        self.note_search = note_search
+
+    def build_indexes(self):
+        """Builds the index structures that are otherwise deferred to the first query."""
+        self.name_index.build()
+        self.email_index.build()
+
+    def _index_record(self, record: Record):
+        """Adds a record to the search indexes."""
+        self.name_index.add(record.name)
+        for phone in record.phones:
+            self.phone_index.add(phone.value, record.name)
+        if record.birthday:
+            self.birthday_calendar.add(record.name, record.birthday.value)
+        if record.email:
+            self.email_index.add(record.email.value, record.name)
+        record.book = self
+
+    def _unindex_record(self, record: Record):
+        """Removes a record from the search indexes."""
+        self.name_index.remove(record.name)
+        for phone in record.phones:
+            self.phone_index.remove(phone.value, record.name)
+        if record.birthday:
+            self.birthday_calendar.remove(record.name, record.birthday.value)
+        if record.email:
+            self.email_index.remove(record.email.value, record.name)
+        record.book = None
+
+    def _clear_indexes(self):
+        """Empties the search indexes."""
+        self.name_index.clear()
+        self.phone_index.clear()
+        self.birthday_calendar.clear()
+        self.email_index.clear()
+
+    def _unshare(self, items: dict, key):
+        """Returns the record or note to change, copied first if a snapshot may still hold it."""
+        item = items[key]
+        if self.copy_on_write is None or key in self.copy_on_write:
+            return item
+        item = item.copy()
+        if isinstance(item, Record):
+            item.book = self
+        items[key] = item
+        self.copy_on_write.add(key)
+        return item
+
+    def _index_note(self, note: Note):
+        """Adds a note or its changed tags to the tag index."""
+        self.tag_index.update(note.title, note.tags)
+
+    def _unindex_note(self, note: Note):
+        """Removes a note from the tag and full-text indexes."""
+        self.tag_index.remove(note.title)
+        self.note_search.remove(note.title, note.text)
+
+    def _reindex_note_text(self, note: Note, old_text: str | None = None):
+        """Updates the full-text index after a note was added or its text changed."""
+        if old_text is None:
+            self.note_search.add(note)
+        else:
+            self.note_search.update(note, old_text)
 
     def add_record(self, record: Record):
         """Adds a record to the address book."""
@@ -22,6 +123,24 @@ class AddressBook(UserDict):
             raise ValueError(f"Contact {record.name} already exists.")
 
         self.data[record.name] = record
+        self._index_record(record)
+        self.events.publish(RecordAdded, record)
+
+    def add_records(self, records: list[Record]):
+        """Adds many new records at once; if any name exists already, none is added.
+
+        Listeners get all the additions in one batch.
+        """
+        existing = [record.name.value for record in records if record.name in self.data]
+        if existing:
+            raise ValueError(f"Contacts already exist: {', '.join(existing[:5])}")
+
+        for record in records:
+            self.data[record.name] = record
+        with self.events.batch():
+            for record in records:
+                self._index_record(record)
+                self.events.publish(RecordAdded, record)
 
     def find(self, name: str, raise_error: bool = True) -> Record | None:
         """Finds a record in the address book."""
@@ -29,65 +148,168 @@ class AddressBook(UserDict):
 
         if name not in self.data:
             if raise_error:
-                raise ValueError(f"Contact is not exist: {name}")
+                suggestions = ", ".join(record.name.value for record in self.find_fuzzy(name.value, limit=3))
+                hint = f". Did you mean: {suggestions}?" if suggestions else ""
+                raise ValueError(f"Contact is not exist: {name}{hint}")
             return None
 
-        return self.data[name]
+        return self._unshare(self.data, name)
+
+    def find_fuzzy(self, name: str, max_distance: int = 2, limit: int = 5) -> list[Record]:
+        """Finds records whose names are within a few typos of the given name."""
+        return [self.data[found] for found in self.name_index.similar(name, max_distance, limit)]
+
+    def find_by_email(self, email: str) -> list[Record]:
+        """Finds records by an email, ignoring case."""
+        return [self.data[name] for name in self.email_index.search(email)]
+
+    def find_by_domain(self, domain: str) -> list[Record]:
+        """Finds records with an email at the domain or its subdomains."""
+        return [self.data[name] for name in self.email_index.search_domain(domain)]
 
     def search_by_email(self, email):
-        found_contacts = []
-        for record in self.data.values():
-            if record.email and record.email.value == email:
-                found_contacts.append(record.name.value)
-        return found_contacts
+        """Returns names of contacts with the email."""
+        return [record.name.value for record in self.find_by_email(email)]
+
+    def iter_records(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        """Yields a page of records in insertion order; ``after`` is the name of the last record seen."""
+        return paginate(self.data.values(), limit, offset, after, record_key)
 
     def find_by_query(self, queries: list[str]) -> list[Record]:
         """Finds records by a search query list."""
-        found = []
-        for query in queries:
-            found.extend(self._find_by_query(query))
-        return found
+        return list(self.iter_by_query(queries))
+
+    def iter_by_query(
+        self, queries: list[str], limit: int | None = None, offset: int = 0, after: str | None = None
+    ):
+        """Yields a page of records matching any of the queries, each record once."""
+        return paginate(self._iter_matches(queries), limit, offset, after, record_key)
 
     def delete(self, name: str):
         """Deletes a record from the address book."""
         name = Name(name)
         if name in self.data:
+            record = self.data[name]
+            self._unindex_record(record)
             del self.data[name]
+            self.events.publish(RecordRemoved, record)
+
+    def delete_all(self):
+        """Deletes all records from the address book."""
+        self.data.clear()
+        self._clear_indexes()
+        self.events.publish(RecordsCleared)
+
+    def _birthdays_on(self, month: int, day: int) -> list[str]:
+        """Returns names of contacts born on the given month and day."""
+        return [name.value for name in self.birthday_calendar.on(month, day)]
 
     def get_upcoming_birthdays(self, upcoming_days=7):
-        """Returns upcoming birthdays."""
+        """Returns upcoming birthdays sorted by congratulation date."""
+        return list(self.iter_upcoming_birthdays(upcoming_days))
+
+    def iter_upcoming_birthdays(self, upcoming_days=7):
+        """Yields upcoming birthdays sorted by congratulation date.
+
+        Walks the calendar day by day, so the window may cross New Year. It ends before
+        the same date next year, so every contact comes at most once and longer windows
+        cost no more. Contacts born on Feb 29 are congratulated on Feb 28 in non-leap years.
+        """
         today = datetime.date.today()
-        upcoming_birthdays = []
-        upcoming_date = today + datetime.timedelta(upcoming_days)
+        leap_day = (today.month, today.day) == (2, 29)
+        if leap_day:
+            # Runs through Feb 28, where contacts born on Feb 29 are not listed again.
+            end = datetime.date(today.year + 1, 2, 28)
+        else:
+            end = today.replace(year=today.year + 1) - datetime.timedelta(1)
+
+        # 7 days including today is 6 days from today
+        for offset in range(min(upcoming_days, (end - today).days) + 1):
+            date = today + datetime.timedelta(offset)
+            names = self._birthdays_on(date.month, date.day)
+            if date.month == 2 and date.day == 28 and not calendar.isleap(date.year) and not leap_day:
+                names += self._birthdays_on(2, 29)
+            if not names:
+                continue
 
-        for user in self.data.values():
-            if not user.birthday:
+            congratulation_date = self._congratulation_date(date).strftime("%d.%m.%Y")
+            for name in names:
+                yield {"name": name, "congratulation_date": congratulation_date}
+
+    @staticmethod
+    def _congratulation_date(date: datetime.date) -> datetime.date:
+        """Moves a birthday that falls on a weekend to the next Monday."""
+        if date.weekday() in (5, 6):
+            return date + datetime.timedelta(days=7 - date.weekday())
+        return date
+
+    def birthday_date_counts(self) -> dict[tuple[int, int, int], int]:
+        """Returns how many contacts were born on each (year, month, day)."""
+        return {(date.year, date.month, date.day): count for date, count in self.birthday_calendar.dates.items()}
+
+    def _born_in(self, month: int, day: int, years: set[int]) -> list[tuple[str, int]]:
+        """Returns (name, birth year) of contacts born on the month and day of one of the years."""
+        return [(name.value, birthday.year) for name, birthday in self.birthday_calendar.born_in(month, day, years)]
+
+    def birthday_stats(self, today: datetime.date | None = None) -> dict:
+        """Returns the number of contacts with a birthday, their average age, and counts per month and age decade.
+
+        Works on the counts per birth date, so the cost grows with the number of
+        distinct dates rather than with the number of contacts.
+        """
+        today = today or datetime.date.today()
+        contacts = 0
+        total_age = 0
+        by_month = [0] * 12
+        by_decade = {}
+        for (year, month, day), count in self.birthday_date_counts().items():
+            age = today.year - year - ((today.month, today.day) < (month, day))
+            contacts += count
+            total_age += age * count
+            by_month[month - 1] += count
+            by_decade[age // 10 * 10] = by_decade.get(age // 10 * 10, 0) + count
+        return {
+            "contacts": contacts,
+            "average_age": total_age / contacts if contacts else 0.0,
+            "by_month": by_month,
+            "by_age": dict(sorted(by_decade.items())),
+        }
+
+    def get_milestone_birthdays(self, ages: list[int], start: datetime.date, end: datetime.date) -> list[dict]:
+        """Returns the contacts turning one of the ages between start and end inclusive, sorted by date.
+
+        Like upcoming birthdays, Feb 29 birthdays count on Feb 28 in non-leap years and
+        weekend birthdays are congratulated on Monday.
+        """
+        found = []
+        for offset in range((end - start).days + 1):
+            date = start + datetime.timedelta(offset)
+            # Ages beyond the calendar have no birth year to look for.
+            years = {date.year - age for age in ages if datetime.MINYEAR <= date.year - age <= datetime.MAXYEAR}
+            if not years:
                 continue
-            birthday = user.birthday.value
-            birthday_this_year = datetime.date(today.year, birthday.month, birthday.day)
-            # 7 days including today is 6 days from today
-            if today <= birthday_this_year <= upcoming_date:
-                congratulation_date = birthday_this_year
-                if birthday_this_year.weekday() in (5, 6):
-                    congratulation_date = birthday_this_year + datetime.timedelta(days=7 - birthday_this_year.weekday())
-
-                upcoming_birthdays.append(
+            born = self._born_in(date.month, date.day, years)
+            if date.month == 2 and date.day == 28 and not calendar.isleap(date.year):
+                born += self._born_in(2, 29, years)
+            congratulation_date = self._congratulation_date(date).strftime("%d.%m.%Y")
+            for name, year in born:
+                found.append(
                     {
-                        "name": user.name.value,
-                        "congratulation_date": congratulation_date.strftime("%d.%m.%Y"),
+                        "name": name,
+                        "age": date.year - year,
+                        "date": date.strftime("%d.%m.%Y"),
+                        "congratulation_date": congratulation_date,
                     }
                 )
-
-        sorted_upcoming_birthdays = sorted(upcoming_birthdays, key=lambda x: x["congratulation_date"])
-        return sorted_upcoming_birthdays
+        return found
 
     def add_email(self, name, email):
         """Add an email to address book."""
         name = Name(name)
         if name in self.data:
-            record = self.data[name]
+            record = self._unshare(self.data, name)
             if isinstance(email, Email):
-                record.email = email
+                record.add_email(email.value)
             else:
                 raise ValueError("Invalid email format")
         else:
@@ -97,9 +319,9 @@ class AddressBook(UserDict):
         """Edit an email in the address book."""
         name = Name(name)
         if name in self.data:
-            record = self.data[name]
+            record = self._unshare(self.data, name)
             if isinstance(new_email, Email):
-                record.email = new_email
+                record.add_email(new_email.value)
             else:
                 raise ValueError("Invalid email format")
         else:
@@ -109,39 +331,86 @@ class AddressBook(UserDict):
         """Remove a record from the address book."""
         name = Name(name)
         if name in self.data:
-            record = self.data[name]
+            record = self._unshare(self.data, name)
             if record.email:
-                del record.email
+                record.remove_email()
             else:
                 raise ValueError(f"No email associated with contact {name}")
         else:
             raise ValueError(f"Contact {name} does not exist")
 
-    def _find_by_query(self, query: str) -> list[Record]:
-        """Finds records by a search query."""
-        found = []
-        query = query.lower()
-
-        for record in self.data.values():
-            if query in record.name.value.lower():
-                found.append(record)
-
-            try:
-                phone = Phone(query)
-                if phone in record.phones:
-                    found.append(record)
-            except ValueError:
-                pass
-
-            try:
-                if record.birthday:
-                    birthday = Birthday(query)
-                    if birthday == record.birthday:
-                        found.append(record)
-            except ValueError:
-                pass
-
-        return found
+    def find_by_phone(self, phone: str) -> list[Record]:
+        """Finds records by a phone number."""
+        phone = Phone(phone)
+        return [self.data[name] for name in self.phone_index.search(phone.value)]
+
+    @staticmethod
+    def _classify_query(query: str) -> tuple[Phone | None, Birthday | None]:
+        """Parses a search query as a phone and as a birthday once."""
+        try:
+            phone = Phone(query)
+        except ValueError:
+            phone = None
+
+        try:
+            birthday = Birthday(query)
+        except ValueError:
+            birthday = None
+
+        return phone, birthday
+
+    def _query_criteria(self, queries: list[str]) -> list[tuple[str, object]]:
+        """Turns search queries into (kind, value) criteria on name, phone and birthday."""
+        criteria = []
+        for query in queries:
+            query = query.lower()
+            phone, birthday = self._classify_query(query)
+            criteria.append(("name", query))
+            if phone:
+                criteria.append(("phone", phone))
+            if birthday:
+                criteria.append(("birthday", birthday))
+        return criteria
+
+    @staticmethod
+    def _matches(record: Record, kind: str, value) -> bool:
+        """Checks a record against one criterion."""
+        if kind == "name":
+            return value in record.name.value.lower()
+        if kind == "phone":
+            return value in record.phones
+        return record.birthday == value
+
+    def _candidates(self, kind: str, value):
+        """Yields records matching one criterion, looked up in the indexes."""
+        if kind == "name":
+            names = self.name_index.iter_search(value)
+        elif kind == "phone":
+            names = self.phone_index.search(value.value)
+        else:
+            names = (
+                name
+                for name in self.birthday_calendar.on(value.value.month, value.value.day)
+                if self.data[name].birthday == value
+            )
+        for name in names:
+            yield self.data[name]
+
+    def _iter_matches(self, queries: list[str]):
+        """Yields records matching any query without remembering the ones already yielded.
+
+        A record found by a criterion is skipped when an earlier criterion matches it
+        too, because that criterion has yielded it already. Name criteria stream from
+        the name index and phone criteria from the phone index's set; a birthday
+        criterion copies the names born on that day, about 1/366 of the book. Nothing
+        else grows with the number of matches.
+        """
+        criteria = self._query_criteria(queries)
+        for position, (kind, value) in enumerate(criteria):
+            earlier = criteria[:position]
+            for record in self._candidates(kind, value):
+                if not any(self._matches(record, *criterion) for criterion in earlier):
+                    yield record
 
     def add_note(self, title, text, tags=None):
         """Add a note."""
@@ -150,6 +419,9 @@ class AddressBook(UserDict):
         else:
             new_note = Note(title, text, tags)
             self.notes[title] = new_note
+            self._index_note(new_note)
+            self._reindex_note_text(new_note)
+            self.events.publish(NoteAdded, new_note)
             return "Note added successfully."
 
     def find_note_by_title(self, title):
@@ -163,7 +435,11 @@ class AddressBook(UserDict):
     def edit_note_text(self, title, new_text):
         """Edit the note."""
         if title in self.notes:
-            self.notes[title].text = new_text
+            note = self._unshare(self.notes, title)
+            old_text = note.text
+            note.text = new_text
+            self._reindex_note_text(note, old_text)
+            self.events.publish(NoteEdited, note, old_text)
             return "Note edited successfully."
         else:
             return "Note not found."
@@ -171,19 +447,24 @@ class AddressBook(UserDict):
     def delete_note_by_title(self, title):
         """Delete the note by title"""
         if title in self.notes:
+            note = self.notes[title]
+            self._unindex_note(note)
             del self.notes[title]
+            self.events.publish(NoteRemoved, note)
             return "Note deleted successfully."
         else:
             return "Note not found."
 
     def add_tags_to_note(self, title, tags):
         """Add tags to note."""
-        note = self.notes.get(title)
+        note = self._unshare(self.notes, title) if title in self.notes else None
         if note:
             existing_tags = set(note.tags)
             new_tags = [tag for tag in tags if tag not in existing_tags]
             if new_tags:
-                note.tags.extend(new_tags)
+                note.tags.extend(sys.intern(tag) for tag in new_tags)
+                self._index_note(note)
+                self.events.publish(TagsChanged, note, new_tags, [])
                 return "New tags added successfully."
             else:
                 return "All provided tags already exist in the note."
@@ -192,20 +473,46 @@ class AddressBook(UserDict):
 
     def remove_tags_from_note(self, title, tags):
         """Remove tages from note."""
-        note = self.notes.get(title)
+        note = self._unshare(self.notes, title) if title in self.notes else None
         if note:
             if all(tag in note.tags for tag in tags):
                 note.remove_tags(tags)
+                self._index_note(note)
+                self.events.publish(TagsChanged, note, [], list(tags))
                 return f"Tags removed from note '{title}' successfully."
             else:
                 return "Some of the provided tags do not exist in the note."
         else:
             return "Note not found."
 
+    def iter_notes(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        """Yields a page of notes in insertion order; ``after`` is the title of the last note seen."""
+        return paginate(self.notes.values(), limit, offset, after, note_key)
+
     def find_notes_by_tags(self, tags):
         """Find note by tags."""
-        matching_notes = []
-        for note in self.notes.values():
-            if set(tags).issubset(note.tags):
-                matching_notes.append(note)
-        return matching_notes
+        return self.query_notes_by_tags([[tag] for tag in tags])
+
+    def query_notes_by_tags(self, groups: list[list[str]], excluded: list[str] = ()) -> list[Note]:
+        """Finds notes having a tag from every group and none of the excluded tags."""
+        return list(self.iter_notes_by_tags(groups, excluded))
+
+    def iter_notes_by_tags(
+        self,
+        groups: list[list[str]],
+        excluded: list[str] = (),
+        limit: int | None = None,
+        offset: int = 0,
+        after: str | None = None,
+    ):
+        """Yields a page of notes matching the tag query, see ``query_notes_by_tags``."""
+        notes = (self.notes[title] for title in self.tag_index.iter_query(groups, excluded))
+        return paginate(notes, limit, offset, after, note_key)
+
+    def tag_counts(self) -> dict[str, int]:
+        """Returns the number of notes per tag."""
+        return self.tag_index.tag_counts()
+
+    def search_notes(self, query: str, limit: int = 10) -> list[tuple[Note, float]]:
+        """Finds notes by words in their title and text, best matches first."""
+        return [(self.notes[title], score) for title, score in self.note_search.search(query, limit)]
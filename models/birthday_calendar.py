@@ -0,0 +1,76 @@
+"""Calendar index of birthdays by month and day."""
+
+import calendar
+import datetime
+
+from .fields import Name
+
+# Day of a leap year at which every month starts, so Feb 29 has its own slot.
+_MONTH_STARTS = [0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335]
+
+
+class BirthdayCalendar:
+    """Class representing 366 birthday buckets keyed by (month, day).
+
+    Buckets are stored in calendar order, so walking a window of days visits
+    birthdays already sorted by date. ``dates`` counts the contacts per birth date,
+    at most a few tens of thousands of keys for any book size, so reports over all
+    birthdays do not need to visit the records.
+    """
+
+    def __init__(self):
+        self.buckets: list[dict[Name, datetime.datetime]] = [{} for _ in range(366)]
+        self.dates: dict[datetime.datetime, int] = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _slot(month: int, day: int) -> int:
+        return _MONTH_STARTS[month - 1] + day - 1
+
+    def add(self, name: Name, birthday: datetime.datetime):
+        """Adds a birthday of a contact."""
+        bucket = self.buckets[self._slot(birthday.month, birthday.day)]
+        previous = bucket.get(name)
+        if previous is None:
+            self.count += 1
+        else:
+            self._uncount(previous)
+        bucket[name] = birthday
+        self.dates[birthday] = self.dates.get(birthday, 0) + 1
+
+    def _uncount(self, birthday: datetime.datetime):
+        if self.dates[birthday] == 1:
+            del self.dates[birthday]
+        else:
+            self.dates[birthday] -= 1
+
+    def remove(self, name: Name, birthday: datetime.datetime):
+        """Removes a birthday of a contact."""
+        bucket = self.buckets[self._slot(birthday.month, birthday.day)]
+        previous = bucket.pop(name, None)
+        if previous is not None:
+            self.count -= 1
+            self._uncount(previous)
+
+    def clear(self):
+        """Removes all birthdays."""
+        for bucket in self.buckets:
+            bucket.clear()
+        self.dates.clear()
+        self.count = 0
+
+    def on(self, month: int, day: int) -> list[Name]:
+        """Returns names of contacts born on the given month and day."""
+        return list(self.buckets[self._slot(month, day)])
+
+    def born_in(self, month: int, day: int, years: set[int]) -> list[tuple[Name, datetime.datetime]]:
+        """Returns (name, birthday) of contacts born on the given month and day of one of the years."""
+        years = {year for year in years if datetime.MINYEAR <= year <= datetime.MAXYEAR}
+        if month == 2 and day == 29:
+            years = {year for year in years if calendar.isleap(year)}
+        if not any(datetime.datetime(year, month, day) in self.dates for year in years):
+            return []
+        return [(name, birthday) for name, birthday in self.buckets[self._slot(month, day)].items() if birthday.year in years]
@@ -1,7 +1,7 @@
 """Colors enum class."""
 
 from enum import Enum
-from prompt_toolkit.styles import Style
+from functools import cache
 
 
 class Colors(Enum):
@@ -14,9 +14,14 @@ class Colors(Enum):
     WARNING = "ansibrightred"
 
 
-prompt_style = Style.from_dict(
-    {
-        # Default style.
-        "": Colors.PRIMARY.value,
-    }
-)
+@cache
+def get_prompt_style():
+    """Returns the prompt style, importing prompt_toolkit on first use."""
+    from prompt_toolkit.styles import Style
+
+    return Style.from_dict(
+        {
+            # Default style.
+            "": Colors.PRIMARY.value,
+        }
+    )
@@ -1,7 +1,10 @@
 """This module contains the Commands Enum class which is used to define the commands that the user can use in the application."""
 
+import importlib
 from enum import Enum
 
+from decorator import instrumented
+
 
 class Commands(Enum):
     """Enum class for the commands that the user can use in the application."""
@@ -10,8 +13,10 @@ class Commands(Enum):
     ADD_BIRTHDAY = "add_birthday"
     SHOW_CONTACT = "show_contact"
     FIND_CONTACTS = "find_contacts"
+    FIND_FUZZY = "find_fuzzy"
     SHOW_BIRTHDAY = "show_birthday"
     BIRTHDAYS = "birthdays"
+    BIRTHDAY_STATS = "birthday_stats"
     CHANGE = "change"
     PHONE = "phone"
     ALL = "all"
@@ -24,17 +29,23 @@ class Commands(Enum):
     EDIT_ADDRESS = "edit_address"
     DELETE_ADDRESS = "delete_address"
     SEARCH_BY_EMAIL = "search_by_email"
+    SEARCH_BY_DOMAIN = "search_by_domain"
     HELP = "help"
     ADD_NOTE = "add_note"
     FIND_NOTE = "find_note"
     EDIT_NOTE = "edit_note"
     DELETE_NOTE = "delete_note"
     SHOW_NOTES = "show_notes"
+    SEARCH_NOTES = "search_notes"
     ADD_TAGS = "add_tags"
     REMOVE_TAGS = "remove_tags"
     FIND_BY_TAGS = "find_by_tags"
+    SHOW_TAGS = "show_tags"
     DELETE = "delete"
     DELETE_ALL = "delete_all"
+    IMPORT = "import"
+    EXPORT = "export"
+    STATS = "stats"
 
     def __str__(self):
         return self.value
@@ -47,17 +58,59 @@ class Commands(Enum):
     @classmethod
     def is_valid(cls, command: str):
         """Checks if the given command is valid."""
-        return command in cls.get_commands()
+        return command in cls._value2member_map_
 
 
 class CommandConfigItem:
-    """Class for the commands configuration."""
+    """Class for the commands configuration.
+
+    ``handler`` is the dotted path of the handler function, imported on first use and
+    wrapped with ``instrumented`` so every call shows up in the stats command.
+    Handlers get the book as the last argument, preceded either by the command
+    arguments spread out or, with ``pass_list``, by the list of arguments.
+    """
 
-    def __init__(self, description: str, hasParams: bool, usage_message: str, ask_args_message: str = None):
+    def __init__(
+        self,
+        description: str,
+        hasParams: bool,
+        usage_message: str,
+        ask_args_message: str = None,
+        handler: str = None,
+        min_args: int = 0,
+        max_args: int | None = 0,
+        pass_list: bool = False,
+    ):
         self.description = description
         self.hasParams = hasParams
         self.usage_message = usage_message
         self.ask_args_message = ask_args_message
+        self.handler = handler
+        self.min_args = min_args
+        self.max_args = max_args
+        self.pass_list = pass_list
+        # The command name, filled in from the commands_config keys.
+        self.name = None
+        self._handler_func = None
+
+    def get_handler(self):
+        """Imports the handler function on first use."""
+        if self._handler_func is None and self.handler:
+            module_name, _, func_name = self.handler.rpartition(".")
+            handler = getattr(importlib.import_module(module_name), func_name)
+            self._handler_func = instrumented(self.name)(handler)
+        return self._handler_func
+
+    def accepts(self, args: list[str]) -> bool:
+        """Checks the number of arguments."""
+        return len(args) >= self.min_args and (self.max_args is None or len(args) <= self.max_args)
+
+    def run(self, args: list[str], book):
+        """Calls the handler with the arguments and the book."""
+        handler = self.get_handler()
+        if self.pass_list:
+            return handler(args, book)
+        return handler(*args, book)
 
     def __str__(self):
         return f"{self.description} Usage: {self.usage_message}"
@@ -72,194 +125,342 @@ commands_config = {
         hasParams=True,
         usage_message="add <name>, <phone>",
         ask_args_message="Enter name and phone",
+        handler="handlers.add_contact",
+        min_args=2,
+        max_args=2,
     ),
     Commands.ADD_BIRTHDAY: CommandConfigItem(
         description="Add birthday date to existed contact.",
         hasParams=True,
         usage_message="add_birthday <name> <birthday> (dd.mm.yyyy)",
         ask_args_message="Enter name and birthday (dd.mm.yyyy)",
+        handler="handlers.add_birthday",
+        min_args=2,
+        max_args=2,
     ),
     Commands.ADD_ADDRESS: CommandConfigItem(
         description="Add an address to a contact.",
         hasParams=True,
         usage_message="add_address <name> <street> <city> <postal_code> <country>",
         ask_args_message="Enter name, street, city, postal code and country",
+        handler="handlers.add_address",
+        min_args=5,
+        max_args=5,
     ),
     Commands.EDIT_ADDRESS: CommandConfigItem(
         description="Edit the address of a contact.",
         hasParams=True,
         usage_message="edit_address <name> <street> <city> <postal_code> <country>",
         ask_args_message="Enter name, street, city, postal code and country",
+        handler="handlers.edit_address",
+        min_args=5,
+        max_args=5,
     ),
     Commands.DELETE_ADDRESS: CommandConfigItem(
         description="Delete the address of a contact.",
         hasParams=True,
         usage_message="delete_address <name>",
         ask_args_message="Enter name",
+        handler="handlers.delete_address",
+        min_args=1,
+        max_args=1,
     ),
     Commands.SHOW_CONTACT: CommandConfigItem(
         description="Show contact by name.",
         hasParams=True,
         usage_message="show_contact <name>",
         ask_args_message="Enter name",
+        handler="handlers.show_contact",
+        min_args=1,
+        max_args=1,
     ),
     Commands.FIND_CONTACTS: CommandConfigItem(
         description="Find contacts by name, phone, birthday.",
         hasParams=True,
-        usage_message="find_contacts <query> <queryN>",
+        usage_message="find_contacts <query> <queryN> [--page <n>] [--limit <n>]",
         ask_args_message="Enter search query (query1, query2, ...)",
+        handler="handlers.find_contacts",
+        min_args=1,
+        max_args=None,
+        pass_list=True,
+    ),
+    Commands.FIND_FUZZY: CommandConfigItem(
+        description="Find contacts with a name similar to the given one.",
+        hasParams=True,
+        usage_message="find_fuzzy <name>",
+        ask_args_message="Enter name",
+        handler="handlers.find_fuzzy",
+        min_args=1,
+        max_args=1,
     ),
     Commands.SHOW_BIRTHDAY: CommandConfigItem(
         description="Show birthday for selected contact.",
         hasParams=True,
         usage_message="show_birthday <name>",
         ask_args_message="Enter name",
+        handler="handlers.show_birthday",
+        min_args=1,
+        max_args=1,
     ),
     Commands.BIRTHDAYS: CommandConfigItem(
-        description="Show all upcoming birthdays in next 7 days.",
+        description="Show all upcoming birthdays in next 7 days or in the given number of days.",
         hasParams=False,
-        usage_message="birthdays",
+        usage_message="birthdays <days>",
         ask_args_message="Enter upcoming days",
+        handler="handlers.birthdays",
+        max_args=1,
+        pass_list=True,
+    ),
+    Commands.BIRTHDAY_STATS: CommandConfigItem(
+        description="Show birthdays per month, ages per decade and who turns 30, 40 or 50, or the given ages, this quarter.",
+        hasParams=False,
+        usage_message="birthday_stats [age1 ... ageN]",
+        ask_args_message="Enter milestone ages",
+        handler="handlers.birthday_stats",
+        max_args=None,
+        pass_list=True,
     ),
     Commands.CHANGE: CommandConfigItem(
         description="Change phone number for existed contact.",
         hasParams=True,
         usage_message="change <name> <phone> <new_phone>",
         ask_args_message="Enter name, phone and new phone",
+        handler="handlers.change_contact",
+        min_args=3,
+        max_args=3,
     ),
     Commands.PHONE: CommandConfigItem(
         description="Show phone number(s) for selected contact.",
         hasParams=True,
         usage_message="phone <name>",
         ask_args_message="Enter name",
+        handler="handlers.show_phone",
+        min_args=1,
+        max_args=1,
     ),
     Commands.ALL: CommandConfigItem(
-        description="Show all existed contacts with data", hasParams=False, usage_message="all", ask_args_message=None
+        description="Show all existed contacts with data.",
+        hasParams=False,
+        usage_message="all [--page <n>] [--limit <n>]",
+        ask_args_message=None,
+        handler="handlers.show_all",
+        max_args=4,
+        pass_list=True,
     ),
     Commands.ADD_NOTE: CommandConfigItem(
         description="Add new note to notes.",
         hasParams=True,
         usage_message="add_note <title>, <note>",
         ask_args_message="Enter title and note",
+        handler="handlers.add_note",
+        min_args=2,
+        max_args=None,
+        pass_list=True,
     ),
     Commands.FIND_NOTE: CommandConfigItem(
         description="Search note by title.",
         hasParams=True,
         usage_message="find_note <title>",
         ask_args_message="Enter title",
+        handler="handlers.find_note_by_title",
+        min_args=1,
+        max_args=1,
+        pass_list=True,
     ),
     Commands.EDIT_NOTE: CommandConfigItem(
         description="Edit note by title.",
         hasParams=True,
         usage_message="edit_note <title>, <note>",
         ask_args_message="Enter title and note",
+        handler="handlers.edit_note_text",
+        min_args=2,
+        max_args=None,
+        pass_list=True,
     ),
     Commands.SHOW_NOTES: CommandConfigItem(
-        description="Show all notes.", hasParams=False, usage_message="show_notes", ask_args_message=None
+        description="Show all notes.",
+        hasParams=False,
+        usage_message="show_notes [--page <n>] [--limit <n>]",
+        ask_args_message=None,
+        handler="handlers.show_notes",
+        max_args=4,
+        pass_list=True,
+    ),
+    Commands.SEARCH_NOTES: CommandConfigItem(
+        description="Search notes by words in title and text.",
+        hasParams=True,
+        usage_message='search_notes <word1> <word2> "<phrase>"',
+        ask_args_message="Enter words to search for",
+        handler="handlers.search_notes",
+        min_args=1,
+        max_args=None,
+        pass_list=True,
     ),
     Commands.DELETE_NOTE: CommandConfigItem(
         description="Delete note by title.",
         hasParams=True,
         usage_message="delete_note <title>",
         ask_args_message="Enter title",
+        handler="handlers.delete_note_by_title",
+        min_args=1,
+        max_args=1,
+        pass_list=True,
     ),
     Commands.ADD_TAGS: CommandConfigItem(
         description="Add many tags to note.",
         hasParams=True,
         usage_message="add_tags <title> <tag1> <tag2> <tag3>",
         ask_args_message="Enter title and tag(s)",
+        handler="handlers.add_tags_to_note",
+        min_args=2,
+        max_args=None,
+        pass_list=True,
     ),
     Commands.REMOVE_TAGS: CommandConfigItem(
         description="Remove many tags from note.",
         hasParams=True,
         usage_message="remove_tags <title> <tag1> <tag2> <tag3>",
         ask_args_message="Enter title tag(s)",
+        handler="handlers.remove_tags_from_note",
+        min_args=2,
+        max_args=None,
+        pass_list=True,
     ),
     Commands.FIND_BY_TAGS: CommandConfigItem(
-        description="Find note by tag.",
+        description="Find note by tag. 'a|b' matches either tag, '-a' excludes a tag.",
         hasParams=True,
-        usage_message="find_by_tags <tag1> <tag2> <tag3>",
+        usage_message="find_by_tags <tag1> <tag2|tag3> <-tag4>",
         ask_args_message="Enter tag(s)",
+        handler="handlers.find_notes_by_tags",
+        min_args=1,
+        max_args=None,
+        pass_list=True,
+    ),
+    Commands.SHOW_TAGS: CommandConfigItem(
+        description="Show all tags with the number of notes.",
+        hasParams=False,
+        usage_message="show_tags",
+        ask_args_message=None,
+        handler="handlers.show_tags",
     ),
     Commands.HELP: CommandConfigItem(
-        description="Show info about existed command for the bot",
+        description="Show info about existed command for the bot.",
         hasParams=False,
         usage_message="help",
         ask_args_message=None,
+        handler="handlers.help_info",
     ),
     Commands.ADD_EMAIL: CommandConfigItem(
         description="Add email to contact.",
         hasParams=True,
         usage_message="add_email <name> <email>",
         ask_args_message="Enter name and email",
+        handler="handlers.add_email",
+        min_args=2,
+        max_args=2,
     ),
     Commands.CHANGE_EMAIL: CommandConfigItem(
         description="Change email by contact.",
         hasParams=True,
-        usage_message="edit_email <email> <new_email>",
-        ask_args_message="Enter email and new email",
+        usage_message="edit_email <name> <new_email>",
+        ask_args_message="Enter name and new email",
+        handler="handlers.edit_email",
+        min_args=2,
+        max_args=2,
     ),
     Commands.REMOVE_EMAIL: CommandConfigItem(
         description="Remove email from contact.",
         hasParams=True,
-        usage_message="remove_email <name> <email>",
-        ask_args_message="Enter name and email",
+        usage_message="remove_email <name>",
+        ask_args_message="Enter name",
+        handler="handlers.remove_email",
+        min_args=1,
+        max_args=1,
     ),
     Commands.SEARCH_BY_EMAIL: CommandConfigItem(
         description="Search contacts by email.",
         hasParams=True,
         usage_message="search_by_email <email>",
         ask_args_message="Enter email",
+        handler="handlers.search_by_email",
+        min_args=1,
+        max_args=1,
+    ),
+    Commands.SEARCH_BY_DOMAIN: CommandConfigItem(
+        description="Search contacts by email domain.",
+        hasParams=True,
+        usage_message="search_by_domain <domain>",
+        ask_args_message="Enter domain",
+        handler="handlers.search_by_domain",
+        min_args=1,
+        max_args=1,
     ),
     Commands.DELETE: CommandConfigItem(
         description="Delete a contact by name.",
         hasParams=True,
         usage_message="delete <name>",
         ask_args_message="Enter name",
+        handler="handlers.delete_contact",
+        min_args=1,
+        max_args=1,
     ),
     Commands.DELETE_ALL: CommandConfigItem(
-        description="Delete all contacts.", hasParams=False, usage_message="delete_all", ask_args_message=None
+        description="Delete all contacts.",
+        hasParams=False,
+        usage_message="delete_all",
+        ask_args_message=None,
+        handler="handlers.delete_all_contacts",
+    ),
+    Commands.IMPORT: CommandConfigItem(
+        description="Import contacts from a CSV, vCard or JSON lines file.",
+        hasParams=True,
+        usage_message="import <file> [--format csv|vcard|jsonl]",
+        ask_args_message="Enter file path",
+        handler="handlers.import_contacts",
+        min_args=1,
+        max_args=3,
+        pass_list=True,
+    ),
+    Commands.EXPORT: CommandConfigItem(
+        description="Export contacts, or the ones matching the queries, to a CSV, vCard or JSON lines file.",
+        hasParams=True,
+        usage_message="export <csv|vcard|jsonl> <file> [query1 ... queryN]",
+        ask_args_message="Enter format, file path and optional search queries",
+        handler="handlers.export_contacts",
+        min_args=2,
+        max_args=None,
+        pass_list=True,
+    ),
+    Commands.STATS: CommandConfigItem(
+        description="Show calls, errors and latency percentiles of the commands run so far.",
+        hasParams=False,
+        usage_message="stats [reset | dump <file> | profile <command> <cprofile|tracemalloc|off>]",
+        ask_args_message="Enter nothing, reset, dump <file> or profile <command> <profiler>",
+        handler="handlers.show_stats",
+        max_args=3,
+        pass_list=True,
+    ),
+    Commands.EXIT: CommandConfigItem(
+        description="Save data and close the bot.",
+        hasParams=False,
+        usage_message="exit",
+        ask_args_message=None,
+    ),
+    Commands.CLOSE: CommandConfigItem(
+        description="Save data and close the bot.",
+        hasParams=False,
+        usage_message="close",
+        ask_args_message=None,
     ),
 }
 
 
-class CommandsDescription(Enum):
-    """Enum class for the commands that the user can use in the application."""
+for _command, _config in commands_config.items():
+    _config.name = _command.value
 
-    ADD = "'add' - Add new contact to contacts. Usage: add <name>, <phone>"
-    ADD_BIRTHDAY = (
-        "'add_birthday' - Add a bithday date to existed contact. Usage: add_birthday <name> <birthday> (dd.mm.yyyy)"
-    )
-    SHOW_BIRTHDAY = "'show_birthday' - Show a birthday for selected contact. Usage: show_birthday <name>"
-    BIRTHDAYS = "'birthdays' - Show all upcoming birthdays in next 7 days."
-    ADD_ADDRESS = "'add_address' - Add an address to selected contact. Usage: add_address <name> <street> <city> <postal_code> <country>"
-    EDIT_ADDRESS = "'edit_address' - Edit an address for selected contact. Usage: edit_address <name> <street> <city> <postal_code> <country> "
-    DELETE_ADDRESS = "'delete_address' - Delete the address of a contact. Usage: delete_address <name>"
-    CHANGE = "'change' - Change a phone number for existed contact. Usage: change <name> <phone> <new_phone>"
-    PHONE = "'phone' - Show a phone number(s) for selected contact. Usage: phone <name>"
-    ALL = "'all' - Show all existed contacts with data"
-    ADD_NOTE = "'add_note' - Add a new note to notes. Usage: add_note <title> <note>"
-    FIND_NOTE = "'find_note' - Searh a note by title. Usage: find_note <title>"
-    EDIT_NOTE = "'edit_note' - Edit a note by title. Usage: edit_note <title> <note>"
-    DELETE_NOTE = "'delete_note' - Delete a note by title. Usage: find_note <title>"
-    SHOW_NOTES = "'show_notes' - Show all notes that were saved. Usage: show_notes"
-    EXIT = "'exit' - Save data and close the bot"
-    CLOSE = "'close' - Save data and close the bot"
-    HELP = "'help' - Show info about existed command for the bot"
-    ADD_TAGS = "'add_tags' - Add many tags to note. Usage: add_tags <title> <tag1> <tag2> <tag3>"
-    REMOVE_TAGS = "'remove_tags' - Removes tags from note. Usage: remove_tags <title> <tag1> <tag2> <tag3>"
-    FIND_BY_TAGS = "'find_by_tags' - Show notes with mentioned tags. Usage: find_by_tags <tag1> <tag2> <tag3>"
-    ADD_EMAIL = "'add_email' - Add email to contact. Usage: add_email <name> <email>"
-    CHANGE_EMAIL = "'change_email' - Change email for existed contact. Usage: change_email <name> <email> <new_email>"
-    REMOVE_EMAIL = "'remove_email' - Remove email from contact. Usage: remove_email <name> <email>"
-    SEARCH_BY_EMAIL = "'search_by_email' - Search contacts by email. Usage: search_by_email <email>"
-    DELETE = "'delete' - Delete a contact by name. Usage: delete <name>"
-    DELETE_ALL = "'delete_all' - Delete all contacts. Usage: delete_all"
+_configs_by_name = {command.value: config for command, config in commands_config.items()}
 
-    def __str__(self):
-        return self.value
 
-    @classmethod
-    def get_commands_description(cls):
-        """Returns a list of all existed commands."""
-        return [str(command) for command in cls]
+def get_command_config(command: str) -> CommandConfigItem | None:
+    """Returns the configuration of a command by its name."""
+    return _configs_by_name.get(command)
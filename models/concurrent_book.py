@@ -0,0 +1,135 @@
+"""Sharing an address book between threads."""
+
+import threading
+from contextlib import contextmanager
+
+from .address_book import AddressBook
+from .fields import Name
+from .pagination import paginate, record_key, note_key
+from .record import Record
+
+
+class ReadWriteLock:
+    """Class representing a lock held by many readers or by one writer.
+
+    Waiting writers go first: new readers wait while a writer is waiting, so a
+    steady stream of readers cannot starve writers. The lock is not reentrant.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """Holds the lock shared with other readers."""
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Holds the lock exclusively."""
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class BookSnapshot:
+    """Class representing a point-in-time, read-only view of the records and notes of a book.
+
+    Taking one copies two dicts, not the records: the book copies a record or note
+    before its first change after the snapshot, so scanning needs no lock.
+    """
+
+    def __init__(self, book: AddressBook):
+        self.data = dict(book.data)
+        self.notes = dict(book.notes)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def find(self, name: str) -> Record | None:
+        """Finds a record by name."""
+        return self.data.get(Name(name))
+
+    def iter_records(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        """Yields a page of records, see ``AddressBook.iter_records``."""
+        return paginate(self.data.values(), limit, offset, after, record_key)
+
+    def iter_notes(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        """Yields a page of notes, see ``AddressBook.iter_notes``."""
+        return paginate(self.notes.values(), limit, offset, after, note_key)
+
+
+class ConcurrentAddressBook:
+    """Class sharing an in-memory address book between threads.
+
+    Any number of threads may read the book at once while writers take turns:
+
+        with shared.read() as book:
+            book.find_by_query(["ann"])
+        with shared.write() as book:
+            book.find("Ann").add_phone("0501234567")
+
+    Long scans should use ``snapshot()`` instead of holding the read lock, so they
+    never block writers. Lazy index work is done while the write lock is held, so
+    reads never change the book. SQLite books keep their connection on one thread
+    and are not meant to be wrapped.
+    """
+
+    def __init__(self, book: AddressBook):
+        self.book = book
+        self.lock = ReadWriteLock()
+        # Keys copied since the last snapshot; None until the first snapshot.
+        self._copied = None
+        book.build_indexes()
+
+    @contextmanager
+    def read(self):
+        """Yields the book for reading; no thread changes it meanwhile."""
+        with self.lock.read():
+            yield self.book
+
+    @contextmanager
+    def write(self):
+        """Yields the book for changing it; no other thread reads or changes it meanwhile."""
+        with self.lock.write():
+            self.book.copy_on_write = self._copied
+            try:
+                yield self.book
+            finally:
+                self.book.copy_on_write = None
+                self.book.build_indexes()
+
+    def snapshot(self) -> BookSnapshot:
+        """Returns the records and notes as they are now."""
+        with self.lock.read():
+            snapshot = BookSnapshot(self.book)
+            # Every record and note is shared with the new snapshot now.
+            self._copied = set()
+        return snapshot
@@ -0,0 +1,98 @@
+"""Case-insensitive email index with a reversed-domain range index."""
+
+from bisect import bisect_left
+from collections import Counter
+
+from .fields import Name
+
+# Up to this many removed entries are deleted from the sorted list one by one; more
+# are filtered out in one pass.
+REMOVE_IN_PLACE = 32
+
+
+def reversed_domain(domain: str) -> str:
+    """Returns a lowercased domain in reversed label order, e.g. 'com.example.'."""
+    labels = domain.lower().split(".")
+    return ".".join(reversed(labels)) + "."
+
+
+class EmailIndex:
+    """Class representing exact-email and domain lookups.
+
+    Exact emails are kept in a hash map. Domains are kept reversed in a sorted list,
+    so all addresses of a domain and its subdomains form one contiguous range. New
+    domains are queued and sorted in on the next domain query: inserting them one by
+    one would shift the list on every add and make loading a book quadratic. For the
+    same reason removed domains only leave a tombstone, purged on the next build.
+    """
+
+    def __init__(self):
+        self.emails: dict[str, set[Name]] = {}
+        self.domains: list[tuple[str, str]] = []
+        self._pending: list[tuple[str, str]] = []
+        self._removed: Counter[tuple[str, str]] = Counter()
+
+    def __len__(self):
+        return len(self.domains) + len(self._pending) - self._removed.total()
+
+    def build(self):
+        """Merges queued domains into the sorted list and drops removed ones."""
+        self.domains.extend(self._pending)
+        self._pending.clear()
+        self.domains.sort()
+        if not self._removed:
+            return
+        if len(self._removed) <= REMOVE_IN_PLACE:
+            for entry, count in self._removed.items():
+                position = bisect_left(self.domains, entry)
+                del self.domains[position : position + count]
+        else:
+            removed = self._removed
+            kept = []
+            for entry in self.domains:
+                if removed.get(entry):
+                    removed[entry] -= 1
+                else:
+                    kept.append(entry)
+            self.domains = kept
+        self._removed.clear()
+
+    def add(self, email: str, name: Name):
+        """Adds an email of a contact."""
+        email = email.lower()
+        self.emails.setdefault(email, set()).add(name)
+        self._pending.append((reversed_domain(email.rpartition("@")[2]), name.value))
+
+    def remove(self, email: str, name: Name):
+        """Removes an email of a contact."""
+        email = email.lower()
+        names = self.emails.get(email)
+        if names is None or name not in names:
+            return
+        names.discard(name)
+        if not names:
+            del self.emails[email]
+        self._removed[(reversed_domain(email.rpartition("@")[2]), name.value)] += 1
+
+    def clear(self):
+        """Removes all emails from the index."""
+        self.emails.clear()
+        self.domains.clear()
+        self._pending.clear()
+        self._removed.clear()
+
+    def search(self, email: str) -> set[Name]:
+        """Returns names of contacts with the email, ignoring case."""
+        return self.emails.get(email.lower(), set())
+
+    def search_domain(self, domain: str) -> list[Name]:
+        """Returns names of contacts with an email at the domain or its subdomains."""
+        if self._pending or self._removed:
+            self.build()
+        prefix = reversed_domain(domain.lstrip("@"))
+        position = bisect_left(self.domains, (prefix,))
+        names = []
+        while position < len(self.domains) and self.domains[position][0].startswith(prefix):
+            names.append(Name(self.domains[position][1]))
+            position += 1
+        return names
@@ -0,0 +1,146 @@
+"""Change events published by an address book and its records to subscribed listeners."""
+
+from contextlib import contextmanager
+
+
+class ChangeEvent:
+    """Base class of the changes made to an address book."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class RecordAdded(ChangeEvent):
+    """A record was added to the book."""
+
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        self.record = record
+
+
+class RecordRemoved(ChangeEvent):
+    """A record was deleted from the book."""
+
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        self.record = record
+
+
+class RecordsCleared(ChangeEvent):
+    """All records were deleted at once; listeners drop what they derived from records."""
+
+    __slots__ = ()
+
+
+class FieldChanged(ChangeEvent):
+    """A field of a record changed.
+
+    ``field`` is ``phones``, ``birthday``, ``email`` or ``address``. For phones ``old``
+    is the removed phone and ``new`` the added one, either may be None; for the
+    other fields they are the values before and after.
+    """
+
+    __slots__ = ("record", "field", "old", "new")
+
+    def __init__(self, record, field: str, old, new):
+        self.record = record
+        self.field = field
+        self.old = old
+        self.new = new
+
+
+class NoteAdded(ChangeEvent):
+    """A note was added."""
+
+    __slots__ = ("note",)
+
+    def __init__(self, note):
+        self.note = note
+
+
+class NoteRemoved(ChangeEvent):
+    """A note was deleted."""
+
+    __slots__ = ("note",)
+
+    def __init__(self, note):
+        self.note = note
+
+
+class NoteEdited(ChangeEvent):
+    """The text of a note changed."""
+
+    __slots__ = ("note", "old_text")
+
+    def __init__(self, note, old_text: str):
+        self.note = note
+        self.old_text = old_text
+
+
+class TagsChanged(ChangeEvent):
+    """Tags were added to or removed from a note."""
+
+    __slots__ = ("note", "added", "removed")
+
+    def __init__(self, note, added: list[str], removed: list[str]):
+        self.note = note
+        self.added = added
+        self.removed = removed
+
+
+class EventBus:
+    """Class delivering change events to listeners.
+
+    A listener is a callable taking a list of events. Events are delivered right
+    after the change, one per call, or all together when the change happens inside
+    ``batch``. Nothing is built while there are no listeners, so an unobserved book
+    pays one attribute check per change.
+    """
+
+    def __init__(self):
+        self.listeners = []
+        self._pending = None
+
+    def subscribe(self, listener):
+        """Adds a listener and returns it, so it can be used as a decorator."""
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        """Removes a listener."""
+        self.listeners.remove(listener)
+
+    def publish(self, event_type: type[ChangeEvent], *args):
+        """Creates an event and delivers it, or queues it until the batch ends."""
+        if not self.listeners:
+            return
+        event = event_type(*args)
+        if self._pending is not None:
+            self._pending.append(event)
+            return
+        for listener in list(self.listeners):
+            listener([event])
+
+    @contextmanager
+    def batch(self):
+        """Delivers the events published inside the block together when it ends.
+
+        Batches nest: only the outermost one delivers. Events of a failed block are
+        still delivered, since the changes made before the failure stay in the book.
+        """
+        if self._pending is not None:
+            yield
+            return
+        self._pending = []
+        try:
+            yield
+        finally:
+            events, self._pending = self._pending, None
+            if events:
+                for listener in list(self.listeners):
+                    listener(events)
@@ -1,9 +1,38 @@
 """Field class."""
 
+from functools import cache
+
+
+@cache
+def slot_names(cls) -> tuple[str, ...]:
+    """Returns the slots of a class and its bases that hold data, skipping ones shadowed by properties."""
+    names = [slot for base in reversed(cls.__mro__) for slot in getattr(base, "__slots__", ())]
+    return tuple(name for name in names if not isinstance(getattr(cls, name, None), property))
+
+
+def dump_slots(obj) -> dict:
+    """Returns the slot attributes of an object in the same shape as a ``__dict__``."""
+    return {name: getattr(obj, name) for name in slot_names(type(obj)) if hasattr(obj, name)}
+
+
+def restore_slots(obj, state: dict):
+    """Restores slot attributes from a pickled state.
+
+    The state is the ``__dict__`` of objects pickled before the models had
+    ``__slots__`` or the dict returned by ``dump_slots`` since, so old
+    addressbook.pkl files keep loading.
+    """
+    names = slot_names(type(obj))
+    for key, value in state.items():
+        if key in names:
+            setattr(obj, key, value)
+
 
 class Field:
     """Field class."""
 
+    __slots__ = ("value",)
+
     def __init__(self, value: any):
         self.value = value
 
@@ -18,3 +47,9 @@ class Field:
 
     def __hash__(self):
         return hash(self.value)
+
+    def __getstate__(self):
+        return dump_slots(self)
+
+    def __setstate__(self, state):
+        restore_slots(self, state)
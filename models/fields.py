@@ -1,28 +1,32 @@
 """Main module for fields."""
 
 import re
+import sys
 import datetime
-from .field import Field
+from .field import Field, dump_slots, restore_slots
 
 
 class Name(Field):
     """Class representing Name."""
 
-    def __init__(self, name: str):
-        super().__init__(name)
+    __slots__ = ()
 
 
 class Phone(Field):
     """Class representing Phone."""
 
-    pattern = r"[+\d]"
+    __slots__ = ()
+
+    pattern = re.compile(r"[+\d]")
     country_code = "38"
 
     def __init__(self, phone_number: str):
-        phone_number = "".join(re.findall(self.pattern, phone_number))
+        phone_number = "".join(self.pattern.findall(phone_number))
 
         if not phone_number.startswith("+"):
-            phone_number = re.sub(rf"^({self.country_code})?", f"+{self.country_code}", phone_number)
+            if not phone_number.startswith(self.country_code):
+                phone_number = f"{self.country_code}{phone_number}"
+            phone_number = f"+{phone_number}"
 
         if len(phone_number) != 13:
             raise ValueError(f"Invalid phone number: {phone_number}")
@@ -33,11 +37,17 @@ class Phone(Field):
 class Birthday(Field):
     """Class representing Birthday."""
 
+    __slots__ = ()
+
+    pattern = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+
     def __init__(self, value):
         try:
-            if not re.match(r"\d{2}\.\d{2}\.\d{4}", value):
+            match = self.pattern.fullmatch(value)
+            if not match:
                 raise ValueError("Invalid date format. Use DD.MM.YYYY")
-            value = datetime.datetime.strptime(value, "%d.%m.%Y")
+            day, month, year = match.groups()
+            value = datetime.datetime(int(year), int(month), int(day))
             if value > datetime.datetime.now():
                 raise ValueError("Invalid date. Birthday can't be in the future.")
             super().__init__(value)
@@ -51,6 +61,10 @@ class Birthday(Field):
 class Email(Field):
     """Class representing Email."""
 
+    __slots__ = ()
+
+    pattern = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
     def __init__(self, value):
         if not self.validate_email(value):
             raise ValueError("Invalid email format")
@@ -60,24 +74,33 @@ class Email(Field):
         return str(self.value)
 
     def validate_email(self, email):
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return self.pattern.match(email) is not None
 
 
 class Address(Field):
     """Class representing an Address."""
 
+    __slots__ = ("street", "city", "postal_code", "country")
+
     def __init__(self, street: str, city: str, postal_code: str, country: str):
         self.street = street
-        self.city = city
+        # Many contacts share a city and a country, keep one copy of each.
+        self.city = sys.intern(city)
         self.postal_code = postal_code
-        self.country = country
-        value = f"{street}, {city}, {postal_code}, {country}"
-        super().__init__(value)
+        self.country = sys.intern(country)
+
+    @property
+    def value(self) -> str:
+        return f"{self.street}, {self.city}, {self.postal_code}, {self.country}"
 
     def __str__(self) -> str:
         return self.value
 
+    def __setstate__(self, state):
+        restore_slots(self, state)
+        self.city = sys.intern(self.city)
+        self.country = sys.intern(self.country)
+
     def __eq__(self, other) -> bool:
         if not isinstance(other, Address):
             return False
@@ -95,16 +118,33 @@ class Address(Field):
 class Note:
     """Class representing notes."""
 
+    __slots__ = ("title", "text", "tags")
+
     def __init__(self, title, text, tags=None):
         self.title = title
         self.text = text
-        self.tags = tags if tags is not None else []
+        self.tags = [sys.intern(tag) for tag in tags] if tags is not None else []
+
+    def __getstate__(self):
+        return dump_slots(self)
+
+    def __setstate__(self, state):
+        restore_slots(self, state)
+        self.tags = [sys.intern(tag) for tag in self.tags]
+
+    def copy(self) -> "Note":
+        """Returns a copy that does not share the tag list with this note."""
+        note = Note.__new__(Note)
+        note.title = self.title
+        note.text = self.text
+        note.tags = list(self.tags)
+        return note
 
     def __str__(self):
         return f"Title: {self.title}\nText: {self.text}\nTags: {self.tags}"
 
     def add_tags(self, tag):
-        self.tags.append(tag)
+        self.tags.append(sys.intern(tag))
 
     def remove_tags(self, tags):
         for tag in tags:
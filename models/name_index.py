@@ -0,0 +1,211 @@
+"""Trigram inverted index over contact names."""
+
+import heapq
+from collections import Counter
+
+from .fields import Name
+
+# Boundary markers turn the first and last characters into trigrams of their own,
+# so short names that differ in one letter still share a gram.
+PAD_START = "\x02"
+PAD_END = "\x03"
+
+# Substring queries whose rarest trigram has at most this many names sort those names;
+# broader ones scan all names lazily in insertion order instead of collecting matches.
+SORTED_CANDIDATES = 4096
+
+# Fuzzy lookups compare only this many names sharing the most trigrams with the query.
+SIMILAR_CANDIDATES = 64
+
+
+def padded_trigrams(text: str) -> set[str]:
+    """Returns trigrams of a text surrounded by boundary markers."""
+    text = f"{PAD_START}{text}{PAD_END}"
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Returns the Levenshtein distance of two strings, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    """Class representing a trigram inverted index for substring name search.
+
+    Every lowercased name is split into overlapping trigrams, and each trigram points
+    to the set of names containing it. A substring query intersects the posting sets
+    of its own trigrams and checks the few remaining candidates. Names are padded
+    with boundary markers, which substring queries never contain, so the same
+    postings also serve fuzzy lookups by shared trigram count. Names are grouped by
+    length too, so fuzzy lookups count only names within reach of the query.
+
+    Postings hold plain strings rather than ``Name`` objects: str hashes are cached
+    in C, while ``Field.__hash__`` runs Python code for every set operation. New
+    names are queued and posted on the first query that needs the postings, so bulk
+    loads and batches of adds do not pay for trigrams nobody reads.
+    """
+
+    size = 3
+
+    def __init__(self):
+        self.postings: dict[str, set[str]] = {}
+        self.names: dict[str, str] = {}
+        self.order: dict[str, int] = {}
+        self.lengths: dict[int, set[str]] = {}
+        self._pending: dict[str, None] = {}
+        self._counter = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def _trigrams(self, text: str) -> set[str]:
+        return {text[i : i + self.size] for i in range(len(text) - self.size + 1)}
+
+    def add(self, name: Name):
+        """Adds a name to the index."""
+        value = name.value
+        lowered = value.lower()
+        self.names[value] = lowered
+        self.order[value] = self._counter
+        self._counter += 1
+        self._pending[value] = None
+
+    def build(self):
+        """Adds the trigrams of queued names to the postings."""
+        postings = self.postings
+        lengths = self.lengths
+        for value in self._pending:
+            length = len(self.names[value])
+            if length in lengths:
+                lengths[length].add(value)
+            else:
+                lengths[length] = {value}
+            for trigram in padded_trigrams(self.names[value]):
+                names = postings.get(trigram)
+                if names is None:
+                    postings[trigram] = {value}
+                else:
+                    names.add(value)
+        self._pending.clear()
+
+    def remove(self, name: Name):
+        """Removes a name from the index."""
+        value = name.value
+        lowered = self.names.pop(value, None)
+        if lowered is None:
+            return
+        del self.order[value]
+        if value in self._pending:
+            del self._pending[value]
+            return
+        same_length = self.lengths[len(lowered)]
+        same_length.discard(value)
+        if not same_length:
+            del self.lengths[len(lowered)]
+        for trigram in padded_trigrams(lowered):
+            names = self.postings[trigram]
+            names.discard(value)
+            if not names:
+                del self.postings[trigram]
+
+    def clear(self):
+        """Removes all names from the index."""
+        self.postings.clear()
+        self.names.clear()
+        self.order.clear()
+        self.lengths.clear()
+        self._pending.clear()
+
+    def search(self, query: str) -> list[Name]:
+        """Returns names containing the query, in insertion order."""
+        return list(self.iter_search(query))
+
+    def iter_search(self, query: str):
+        """Yields names containing the query, in insertion order.
+
+        Memory is bounded by ``SORTED_CANDIDATES`` however many names match.
+        """
+        query = query.lower()
+        if len(query) < self.size:
+            # Too short for trigrams: scan the lowercased names only.
+            yield from (Name(value) for value, lowered in self.names.items() if query in lowered)
+            return
+
+        if self._pending:
+            self.build()
+        postings = []
+        for trigram in self._trigrams(query):
+            names = self.postings.get(trigram)
+            if not names:
+                return
+            postings.append(names)
+
+        postings.sort(key=len)
+        if len(postings[0]) <= SORTED_CANDIDATES:
+            candidates = postings[0].intersection(*postings[1:])
+            found = [value for value in candidates if query in self.names[value]]
+            found.sort(key=self.order.__getitem__)
+            yield from map(Name, found)
+            return
+
+        # Names are kept in insertion order, so a scan yields matches in order as it
+        # finds them and holds nothing but the current name.
+        rarest = postings[0]
+        for value, lowered in self.names.items():
+            if value in rarest and query in lowered:
+                yield Name(value)
+
+    def similar(self, query: str, max_distance: int = 2, limit: int = 5) -> list[Name]:
+        """Returns up to ``limit`` names within ``max_distance`` edits, closest first.
+
+        An edit destroys at most three trigrams, so only names sharing enough trigrams
+        with the query and differing in length by at most ``max_distance`` qualify; at
+        least one shared trigram is always required. Of those, only the
+        ``SIMILAR_CANDIDATES`` sharing the most trigrams are compared, which bounds the
+        work when a short query leaves the threshold at one.
+        """
+        if self._pending:
+            self.build()
+        query = query.lower()
+        grams = padded_trigrams(query)
+        threshold = max(1, len(grams) - 3 * max_distance)
+        postings = sorted((self.postings.get(gram, frozenset()) for gram in grams), key=len)
+        # A name missing from all of the smallest len - threshold + 1 postings shares
+        # fewer than threshold trigrams, so only those are counted for every name.
+        prefix = len(grams) - threshold + 1
+        lengths = [
+            self.lengths[length]
+            for length in range(len(query) - max_distance, len(query) + max_distance + 1)
+            if length in self.lengths
+        ]
+        shared = Counter()
+        for names in postings[:prefix]:
+            for same_length in lengths:
+                shared.update(names & same_length)
+
+        rest = postings[prefix:]
+        candidates = []
+        for value, count in shared.items():
+            for others in rest:
+                count += value in others
+            if count >= threshold:
+                candidates.append((count, value))
+
+        found = []
+        for count, value in heapq.nlargest(SIMILAR_CANDIDATES, candidates, key=lambda item: item[0]):
+            distance = edit_distance(query, self.names[value], max_distance)
+            if distance <= max_distance:
+                found.append((distance, -count, self.order[value], value))
+
+        found.sort()
+        return [Name(value) for *_, value in found[:limit]]
@@ -0,0 +1,116 @@
+"""Full-text search over notes with BM25 ranking."""
+
+import heapq
+import math
+import re
+
+from .fields import Note
+
+TOKEN_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercased word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query: str) -> tuple[list[str], list[list[str]]]:
+    """Splits a query into terms and "quoted phrases"."""
+    terms = []
+    phrases = []
+    for phrase, word in QUERY_PATTERN.findall(query):
+        tokens = tokenize(phrase if phrase else word)
+        terms.extend(tokens)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+    return terms, phrases
+
+
+class NoteSearchIndex:
+    """Class representing a positional inverted index over note titles and texts.
+
+    Postings map a term to the positions it takes in every note. Scores use
+    BM25, and only the best ``limit`` notes are kept in a bounded heap.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, notes=None):
+        self.postings: dict[str, dict[str, list[int]]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_length = 0
+        for note in notes or ():
+            self.add(note)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def matches(self, notes: dict) -> bool:
+        """Checks that the index covers exactly the given notes."""
+        return len(self.lengths) == len(notes) and all(title in self.lengths for title in notes)
+
+    def add(self, note: Note):
+        """Adds a note to the index."""
+        tokens = tokenize(f"{note.title} {note.text}")
+        self.lengths[note.title] = len(tokens)
+        self.total_length += len(tokens)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(note.title, []).append(position)
+
+    def remove(self, title: str, text: str):
+        """Removes a note with the given indexed text from the index."""
+        length = self.lengths.pop(title, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for token in set(tokenize(f"{title} {text}")):
+            documents = self.postings.get(token)
+            if documents is None:
+                continue
+            documents.pop(title, None)
+            if not documents:
+                del self.postings[token]
+
+    def update(self, note: Note, old_text: str):
+        """Re-indexes a note whose text changed."""
+        self.remove(note.title, old_text)
+        self.add(note)
+
+    def _has_phrase(self, title: str, phrase: list[str]) -> bool:
+        starts = self.postings.get(phrase[0], {}).get(title, ())
+        for offset, token in enumerate(phrase[1:], start=1):
+            positions = set(self.postings.get(token, {}).get(title, ()))
+            starts = [start for start in starts if start + offset in positions]
+            if not starts:
+                return False
+        return bool(starts)
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        """Returns up to ``limit`` (title, score) pairs, best first."""
+        terms, phrases = parse_query(query)
+        if not self.lengths or not terms:
+            return []
+
+        count = len(self.lengths)
+        average_length = self.total_length / count
+        scores = {}
+        for term in set(terms):
+            documents = self.postings.get(term)
+            if not documents:
+                continue
+            idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+            for title, positions in documents.items():
+                frequency = len(positions)
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[title] / average_length)
+                scores[title] = scores.get(title, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        candidates = scores.items()
+        if phrases:
+            candidates = (
+                (title, score)
+                for title, score in candidates
+                if all(self._has_phrase(title, phrase) for phrase in phrases)
+            )
+        return heapq.nlargest(limit, candidates, key=lambda item: item[1])
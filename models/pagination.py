@@ -0,0 +1,35 @@
+"""Lazy pagination of query results."""
+
+from collections.abc import Callable, Iterable, Iterator
+from itertools import islice
+
+
+def paginate(
+    items: Iterable,
+    limit: int | None = None,
+    offset: int = 0,
+    after: str | None = None,
+    key: Callable | None = None,
+) -> Iterator:
+    """Yields one page of items without materializing the rest.
+
+    ``after`` is a cursor: the key of the last item of the previous page. Items up
+    to and including it are skipped before ``offset`` is applied; an unknown cursor
+    yields nothing.
+    """
+    items = iter(items)
+    if after is not None:
+        for item in items:
+            if key(item) == after:
+                break
+    yield from islice(items, offset, None if limit is None else offset + limit)
+
+
+def record_key(record) -> str:
+    """Cursor key of a record: its name."""
+    return record.name.value
+
+
+def note_key(note) -> str:
+    """Cursor key of a note: its title."""
+    return note.title
@@ -0,0 +1,34 @@
+"""Hash index from normalized phone numbers to contact names."""
+
+from .fields import Name
+
+
+class PhoneIndex:
+    """Class representing a reverse phone lookup index."""
+
+    def __init__(self):
+        self.names: dict[str, set[Name]] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, phone: str, name: Name):
+        """Adds a normalized phone number of a contact."""
+        self.names.setdefault(phone, set()).add(name)
+
+    def remove(self, phone: str, name: Name):
+        """Removes a normalized phone number of a contact."""
+        names = self.names.get(phone)
+        if names is None:
+            return
+        names.discard(name)
+        if not names:
+            del self.names[phone]
+
+    def clear(self):
+        """Removes all phone numbers from the index."""
+        self.names.clear()
+
+    def search(self, phone: str) -> set[Name]:
+        """Returns names of contacts with the normalized phone number."""
+        return self.names.get(phone, set())
@@ -1,11 +1,20 @@
 """Module for record model"""
 
+from .events import FieldChanged
+from .field import restore_slots
 from .fields import Name, Phone, Birthday, Address, Email
 from typing import List
 
 
 class Record:
-    """Class representing a record in the address book."""
+    """Class representing a record in the address book.
+
+    ``version`` goes up with every change made through the methods below; rendered
+    text is cached per record and reused while the version stays the same. Changes
+    of a record in a book are also published to the book's listeners.
+    """
+
+    __slots__ = ("name", "phones", "birthday", "address", "email", "book", "version", "_rendered")
 
     def __init__(self, name: str):
         self.name = Name(name)
@@ -13,8 +22,46 @@ class Record:
         self.birthday = None
         self.address = None
         self.email = None
-
-    def __str__(self):
+        self.book = None
+        self.version = 0
+        self._rendered = None
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot not in ("book", "version", "_rendered")}
+
+    def __setstate__(self, state):
+        restore_slots(self, state)
+        self.book = None
+        self.version = 0
+        self._rendered = None
+
+    def copy(self) -> "Record":
+        """Returns a copy detached from the book that shares no mutable state with this record."""
+        record = Record.__new__(Record)
+        record.name = self.name
+        record.phones = list(self.phones)
+        record.birthday = self.birthday
+        record.address = self.address
+        record.email = self.email
+        record.book = None
+        record.version = self.version
+        record._rendered = self._rendered
+        return record
+
+    def rendered(self, kind: str, render) -> str:
+        """Returns ``render(self)``, reusing the text of the last call of the same kind while the record is unchanged.
+
+        One text is kept per record, so listings and an export of another format
+        replace each other's cache.
+        """
+        cached = self._rendered
+        if cached is not None and cached[0] == self.version and cached[1] == kind:
+            return cached[2]
+        text = render(self)
+        self._rendered = (self.version, kind, text)
+        return text
+
+    def _render(self) -> str:
         message = f"Contact name: {self.name.value}\n"
         message += f"Phones: {'; '.join(p.value for p in self.phones)}\n"
         message += f"Birthday: {self.birthday or 'Not set'}\n"
@@ -22,12 +69,23 @@ class Record:
         message += f"Email: {self.email or 'Not set'}"
         return message
 
+    def __str__(self):
+        return self.rendered("str", Record._render)
+
+    def _changed(self, field: str, old, new):
+        self.version += 1
+        if self.book is not None:
+            self.book.events.publish(FieldChanged, self, field, old, new)
+
     def add_phone(self, phone: str):
         """Adds a phone to the record."""
-        if self.find_phone(phone):
-            raise ValueError("Phone already exists.")
         phone = Phone(phone)
+        if phone in self.phones:
+            raise ValueError("Phone already exists.")
         self.phones.append(phone)
+        if self.book is not None:
+            self.book.phone_index.add(phone.value, self.name)
+        self._changed("phones", None, phone)
         return phone
 
     def remove_phone(self, phone: str):
@@ -35,13 +93,21 @@ class Record:
         phone_to_remove = self.find_phone(phone)
         if phone_to_remove:
             self.phones.remove(phone_to_remove)
+            if self.book is not None:
+                self.book.phone_index.remove(phone_to_remove.value, self.name)
+            self._changed("phones", phone_to_remove, None)
 
     def edit_phone(self, phone: str, new_phone: str):
         """Edit a phone in the record."""
         phone_to_update = self.find_phone(phone)
         if not phone_to_update:
             raise ValueError("Phone does not exist")
-        self.phones[self.phones.index(phone_to_update)] = Phone(new_phone)
+        new_phone = Phone(new_phone)
+        self.phones[self.phones.index(phone_to_update)] = new_phone
+        if self.book is not None:
+            self.book.phone_index.remove(phone_to_update.value, self.name)
+            self.book.phone_index.add(new_phone.value, self.name)
+        self._changed("phones", phone_to_update, new_phone)
 
     def find_phone(self, phone: str) -> Phone | None:
         """Find phones in the record."""
@@ -53,22 +119,37 @@ class Record:
 
     def add_birthday(self, birthday: str):
         """Add birthday to the record."""
-        self.birthday = Birthday(birthday)
+        birthday = Birthday(birthday)
+        if self.book is not None:
+            if self.birthday:
+                self.book.birthday_calendar.remove(self.name, self.birthday.value)
+            self.book.birthday_calendar.add(self.name, birthday.value)
+        old, self.birthday = self.birthday, birthday
+        self._changed("birthday", old, birthday)
+
+    def _set_email(self, email: Email | None):
+        if self.book is not None:
+            if self.email:
+                self.book.email_index.remove(self.email.value, self.name)
+            if email:
+                self.book.email_index.add(email.value, self.name)
+        old, self.email = self.email, email
+        self._changed("email", old, email)
 
     def add_email(self, email: str):
         """Add email to the record."""
-        self.email = Email(email)
+        self._set_email(Email(email))
 
     def edit_email(self, new_email: str):
         """Edit email in the record."""
         if not self.email:
             raise ValueError("No email to edit. Add an email first.")
-        self.email = Email(new_email)
+        self._set_email(Email(new_email))
 
     def remove_email(self):
         """Remove a email from the record."""
         if self.email:
-            self.email = None
+            self._set_email(None)
         else:
             raise ValueError("No email to remove.")
 
@@ -81,14 +162,17 @@ class Record:
 
     def add_address(self, street: str, city: str, postal_code: str, country: str):
         """Add address to the record."""
-        self.address = Address(street, city, postal_code, country)
+        old, self.address = self.address, Address(street, city, postal_code, country)
+        self._changed("address", old, self.address)
         return self.address
 
     def edit_address(self, street: str, city: str, postal_code: str, country: str):
         """Edit address in the record."""
-        self.address = Address(street, city, postal_code, country)
+        old, self.address = self.address, Address(street, city, postal_code, country)
+        self._changed("address", old, self.address)
         return self.address
 
     def delete_address(self):
         """Delete the address from the record."""
-        self.address = None
+        old, self.address = self.address, None
+        self._changed("address", old, None)
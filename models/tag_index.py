@@ -0,0 +1,153 @@
+"""Tag inverted index over notes backed by integer bitmaps."""
+
+
+class TagIndex:
+    """Class representing tag postings as bitmaps of note ids.
+
+    Notes and tags are dictionary-encoded to small integers. Each tag id owns a
+    Python int whose set bits are the ids of the notes carrying the tag, so
+    AND/OR/NOT queries are single bitwise operations. Once more than half of the
+    note ids belong to removed notes, the notes left are renumbered.
+    """
+
+    def __init__(self, notes=None):
+        self.note_ids: dict[str, int] = {}
+        self.titles: list[str | None] = []
+        self.note_tags: dict[int, set[int]] = {}
+        self.tag_ids: dict[str, int] = {}
+        self.tags: list[str] = []
+        self.bitmaps: list[int] = []
+        self.counts: list[int] = []
+        self.removed = 0
+        self.removed_count = 0
+        if notes:
+            self._build(notes)
+
+    def _build(self, notes):
+        """Indexes many notes at once, setting bits in byte buffers instead of ints."""
+        buffers = []
+        for note in notes:
+            note_id = self._note_id(note.title)
+            tag_ids = {self._tag_id(tag) for tag in note.tags}
+            self.note_tags[note_id] = tag_ids
+            for tag_id in tag_ids:
+                while len(buffers) <= tag_id:
+                    buffers.append(bytearray(len(notes) // 8 + 1))
+                buffers[tag_id][note_id >> 3] |= 1 << (note_id & 7)
+                self.counts[tag_id] += 1
+
+        self.bitmaps = [int.from_bytes(buffer, "little") for buffer in buffers]
+        self.bitmaps.extend(0 for _ in range(len(self.tags) - len(self.bitmaps)))
+
+    def _note_id(self, title: str) -> int:
+        note_id = self.note_ids.get(title)
+        if note_id is None:
+            note_id = self.note_ids[title] = len(self.titles)
+            self.titles.append(title)
+        return note_id
+
+    def _tag_id(self, tag: str) -> int:
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self.tag_ids[tag] = len(self.tags)
+            self.tags.append(tag)
+            self.bitmaps.append(0)
+            self.counts.append(0)
+        return tag_id
+
+    def update(self, title: str, tags: list[str]):
+        """Sets the tags of a note, adding the note if it is new."""
+        note_id = self._note_id(title)
+        old_tag_ids = self.note_tags.get(note_id, set())
+        new_tag_ids = {self._tag_id(tag) for tag in tags}
+        bit = 1 << note_id
+
+        for tag_id in new_tag_ids - old_tag_ids:
+            self.bitmaps[tag_id] |= bit
+            self.counts[tag_id] += 1
+        for tag_id in old_tag_ids - new_tag_ids:
+            self.bitmaps[tag_id] &= ~bit
+            self.counts[tag_id] -= 1
+        self.note_tags[note_id] = new_tag_ids
+
+    def remove(self, title: str):
+        """Removes a note from the index."""
+        note_id = self.note_ids.pop(title, None)
+        if note_id is None:
+            return
+        bit = 1 << note_id
+        for tag_id in self.note_tags.pop(note_id):
+            self.bitmaps[tag_id] &= ~bit
+            self.counts[tag_id] -= 1
+        self.titles[note_id] = None
+        self.removed |= bit
+        self.removed_count += 1
+        if self.removed_count * 2 > len(self.titles):
+            self._renumber()
+
+    def _renumber(self):
+        """Gives the notes left consecutive ids in insertion order, dropping the removed ones."""
+        old_ids = self.note_ids
+        old_tags = self.note_tags
+        self.titles = [title for title in self.titles if title is not None]
+        self.note_ids = {title: note_id for note_id, title in enumerate(self.titles)}
+        self.note_tags = {note_id: old_tags[old_ids[title]] for note_id, title in enumerate(self.titles)}
+
+        buffers = [bytearray(len(self.titles) // 8 + 1) for _ in self.tags]
+        for note_id, tag_ids in self.note_tags.items():
+            for tag_id in tag_ids:
+                buffers[tag_id][note_id >> 3] |= 1 << (note_id & 7)
+        self.bitmaps = [int.from_bytes(buffer, "little") for buffer in buffers]
+        self.removed = 0
+        self.removed_count = 0
+
+    def clear(self):
+        """Removes all notes and tags from the index."""
+        self.__init__()
+
+    @property
+    def live(self) -> int:
+        """Bitmap of the notes in the index.
+
+        Ids of removed notes are not reused until the notes are renumbered, so only
+        removals are tracked and a new note costs no bitmap copy.
+        """
+        return ((1 << len(self.titles)) - 1) & ~self.removed
+
+    def count(self, tag: str) -> int:
+        """Returns the number of notes with the tag."""
+        tag_id = self.tag_ids.get(tag)
+        return 0 if tag_id is None else self.counts[tag_id]
+
+    def tag_counts(self) -> dict[str, int]:
+        """Returns the number of notes per tag."""
+        return {tag: count for tag, count in zip(self.tags, self.counts) if count}
+
+    def _bitmap(self, tag: str) -> int:
+        tag_id = self.tag_ids.get(tag)
+        return 0 if tag_id is None else self.bitmaps[tag_id]
+
+    def query(self, groups: list[list[str]], excluded: list[str] = ()) -> list[str]:
+        """Returns titles of notes matching every group and none of the excluded tags.
+
+        A group matches when a note carries any of its tags.
+        """
+        return list(self.iter_query(groups, excluded))
+
+    def iter_query(self, groups: list[list[str]], excluded: list[str] = ()):
+        """Yields titles of matching notes in insertion order, see ``query``."""
+        result = self.live
+        for group in groups:
+            any_bitmap = 0
+            for tag in group:
+                any_bitmap |= self._bitmap(tag)
+            result &= any_bitmap
+        for tag in excluded:
+            result &= ~self._bitmap(tag)
+
+        # Scan the set bits of one binary string rather than peeling them off the int.
+        bits = bin(result)[:1:-1]
+        position = bits.find("1")
+        while position != -1:
+            yield self.titles[position]
+            position = bits.find("1", position + 1)
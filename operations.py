@@ -0,0 +1,115 @@
+"""Changes made by the journaled commands, shared by their handlers and journal replay.
+
+Each function takes the arguments its handler is called and journaled with, the book
+last, changes the book without printing anything and returns what the handler
+reports. Replaying a journal entry calls the same function, so a command and its
+replay cannot drift apart.
+"""
+
+from models import AddressBook, Phone, Record
+
+
+def add_contact(name: str, phone: str, book: AddressBook) -> tuple[bool, Phone | None]:
+    """Adds a contact or a phone of an existing one; returns whether it is new and the added phone."""
+    record = book.find(name, raise_error=False)
+    created = record is None
+    if created:
+        record = Record(name)
+        book.add_record(record)
+    return created, record.add_phone(phone) if phone else None
+
+
+def change_contact(name: str, phone: str, new_phone: str, book: AddressBook):
+    book.find(name).edit_phone(phone, new_phone)
+
+
+def add_birthday(name: str, birthday: str, book: AddressBook):
+    book.find(name).add_birthday(birthday)
+
+
+def add_email(name: str, email: str, book: AddressBook):
+    book.find(name).add_email(email)
+
+
+def edit_email(name: str, new_email: str, book: AddressBook):
+    book.find(name).edit_email(new_email)
+
+
+def remove_email(name: str, book: AddressBook):
+    book.find(name).remove_email()
+
+
+def add_address(name: str, street: str, city: str, postal_code: str, country: str, book: AddressBook):
+    return book.find(name).add_address(street, city, postal_code, country)
+
+
+def edit_address(name: str, street: str, city: str, postal_code: str, country: str, book: AddressBook):
+    return book.find(name).edit_address(street, city, postal_code, country)
+
+
+def delete_address(name: str, book: AddressBook):
+    book.find(name).delete_address()
+
+
+def delete_contact(name: str, book: AddressBook):
+    book.delete(name)
+
+
+def delete_all_contacts(book: AddressBook):
+    book.delete_all()
+
+
+def add_note(args: list[str], book: AddressBook) -> str:
+    if len(args) < 2:
+        raise IndexError("Invalid command. Usage: add_note <title> <text>")
+    title, *text = args
+    return book.add_note(title, " ".join(text))
+
+
+def edit_note_text(args: list[str], book: AddressBook) -> str:
+    if len(args) < 2:
+        raise IndexError("Invalid command. Usage: edit_note <title> <text>")
+    title, *new_text = args
+    return book.edit_note_text(title, " ".join(new_text))
+
+
+def delete_note_by_title(args: list[str], book: AddressBook) -> str:
+    if len(args) < 1:
+        raise IndexError("Invalid command. Usage: delete_note <title>")
+    (title,) = args
+    return book.delete_note_by_title(title)
+
+
+def add_tags_to_note(args: list[str], book: AddressBook) -> str:
+    if len(args) < 2:
+        raise IndexError("Invalid command. Usage: add_tags_to_note <title> <tag1> <tag2> ...")
+    title, *tags = args
+    return book.add_tags_to_note(title, tags)
+
+
+def remove_tags_from_note(args: list[str], book: AddressBook) -> str:
+    if len(args) < 2:
+        raise IndexError("Invalid command. Usage: remove_tags_from_note <title> <tag1> <tag2> ...")
+    title, *tags = args
+    return book.remove_tags_from_note(title, tags)
+
+
+# Maps the name of every journaled handler to the change it makes.
+OPERATIONS = {
+    "add_contact": add_contact,
+    "change_contact": change_contact,
+    "add_birthday": add_birthday,
+    "add_email": add_email,
+    "edit_email": edit_email,
+    "remove_email": remove_email,
+    "add_address": add_address,
+    "edit_address": edit_address,
+    "delete_address": delete_address,
+    "delete_contact": delete_contact,
+    "delete_all_contacts": delete_all_contacts,
+    "add_note": add_note,
+    "edit_note_text": edit_note_text,
+    "delete_note_by_title": delete_note_by_title,
+    "add_tags_to_note": add_tags_to_note,
+    "remove_tags_from_note": remove_tags_from_note,
+}
@@ -0,0 +1,156 @@
+"""Per-command call counts, error counts and latency percentiles, with optional profiling."""
+
+import json
+import math
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Latency percentiles are computed over this many most recent calls of a command.
+SAMPLES = 10_000
+
+# Profiled calls print this many of the hottest functions or allocation sites.
+PROFILE_LINES = 20
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+class CommandStats:
+    """Class collecting the calls of one command."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, elapsed: float, failed: bool):
+        """Records one call that took ``elapsed`` seconds."""
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        self.samples.append(elapsed)
+
+    def percentile(self, q: float) -> float:
+        """Returns the latency in seconds that ``q`` percent of the recent calls did not exceed."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        # Nearest rank: the smallest sample with at least q percent of the samples at or below it.
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered) / 100) - 1))]
+
+    def as_dict(self) -> dict:
+        """Returns the counts and the latencies in milliseconds."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+        }
+
+
+_stats: dict[str, CommandStats] = {}
+_profiled: dict[str, str] = {}
+_failed = False
+
+
+def mark_failed():
+    """Counts the running call as an error although it returns normally.
+
+    Handlers that print their input errors instead of raising call this.
+    """
+    global _failed
+    _failed = True
+
+
+@contextmanager
+def measure(name: str):
+    """Times the block as one call of ``name``; an exception counts as an error."""
+    global _failed
+    outer, _failed = _failed, False
+    profile = _profiled.get(name)
+    start = time.perf_counter()
+    failed = True
+    try:
+        with _profiling(name, profile) if profile else nullcontext():
+            yield
+        failed = _failed
+    finally:
+        elapsed = time.perf_counter() - start
+        _stats.setdefault(name, CommandStats()).add(elapsed, failed)
+        _failed = outer
+
+
+@contextmanager
+def _profiling(name: str, mode: str):
+    """Profiles the block and prints the hottest functions or allocation sites to stderr."""
+    if mode == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            print(f"Profile of {name}:", file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        return
+
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        # Leave out the snapshots themselves.
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        before, after = before.filter_traces(ignored), after.filter_traces(ignored)
+        print(f"Allocations of {name}, peak {peak / 1024:,.0f} KiB:", file=sys.stderr)
+        for difference in after.compare_to(before, "lineno")[:PROFILE_LINES]:
+            print(f"  {difference}", file=sys.stderr)
+
+
+def set_profiling(name: str, mode: str | None):
+    """Profiles every following call of ``name`` with cProfile or tracemalloc, or stops with None."""
+    if mode is None:
+        _profiled.pop(name, None)
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profiler {mode}, use one of: {', '.join(PROFILE_MODES)}")
+    _profiled[name] = mode
+
+
+def profiled() -> dict[str, str]:
+    """Returns the profiled names with their profiler."""
+    return dict(_profiled)
+
+
+def report() -> dict[str, dict]:
+    """Returns the statistics of every name measured so far, slowest in total first."""
+    ordered = sorted(_stats.items(), key=lambda item: -item[1].total)
+    return {name: stats.as_dict() for name, stats in ordered}
+
+
+def reset_stats():
+    """Forgets everything measured so far."""
+    _stats.clear()
+
+
+def dump_stats(filename: str):
+    """Writes the statistics to a JSON file."""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2)
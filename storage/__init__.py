@@ -0,0 +1,7 @@
+"""Export all storage engines from this package."""
+
+from .exporting import *
+from .importing import *
+from .journal import *
+from .loading import *
+from .sqlite_book import *
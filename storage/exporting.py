@@ -0,0 +1,158 @@
+"""Streaming export of contacts to CSV, vCard and JSON lines files, and of notes to JSON lines."""
+
+import csv
+import io
+import json
+import os
+
+from cancellation import check_cancelled
+from models import AddressBook, Record
+from .sqlite_book import SQLiteAddressBook
+
+CSV_COLUMNS = ["name", "phone", "email", "birthday", "street", "city", "postal_code", "country"]
+
+# Writes go through a buffer of this size, so the file gets few large writes.
+WRITE_BUFFER = 1024 * 1024
+
+# SQLite books forget the records written so far every this many records.
+EVICT_RECORDS = 10_000
+
+
+class ExportResult:
+    """Class representing the outcome of an export."""
+
+    def __init__(self):
+        self.contacts = 0
+        self.notes = 0
+
+
+def _csv_writer(f):
+    csv.writer(f, lineterminator="\n").writerow(CSV_COLUMNS)
+    line = io.StringIO()
+    writer = csv.writer(line, lineterminator="\n")
+
+    def render(record: Record) -> str:
+        line.seek(0)
+        line.truncate()
+        address = record.address
+        writer.writerow(
+            [
+                record.name.value,
+                ";".join(phone.value for phone in record.phones),
+                record.email.value if record.email else "",
+                str(record.birthday) if record.birthday else "",
+                address.street if address else "",
+                address.city if address else "",
+                address.postal_code if address else "",
+                address.country if address else "",
+            ]
+        )
+        return line.getvalue()
+
+    def write(record: Record):
+        f.write(record.rendered("csv", render))
+
+    return write
+
+
+def _escape_vcard(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+
+def _render_vcard(record: Record) -> str:
+    name = _escape_vcard(record.name.value)
+    lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{name}", f"N:;{name};;;"]
+    lines += [f"TEL:{phone.value}" for phone in record.phones]
+    if record.email:
+        lines.append(f"EMAIL:{record.email.value}")
+    if record.birthday:
+        lines.append(f"BDAY:{record.birthday.value:%Y-%m-%d}")
+    if record.address:
+        address = record.address
+        parts = (address.street, address.city, "", address.postal_code, address.country)
+        lines.append("ADR:;;" + ";".join(_escape_vcard(part) for part in parts))
+    lines.append("END:VCARD\r\n")
+    return "\r\n".join(lines)
+
+
+def _vcard_writer(f):
+    def write(record: Record):
+        f.write(record.rendered("vcard", _render_vcard))
+
+    return write
+
+
+def _record_object(record: Record) -> dict:
+    address = record.address
+    return {
+        "name": record.name.value,
+        "phones": [phone.value for phone in record.phones],
+        "email": record.email.value if record.email else None,
+        "birthday": str(record.birthday) if record.birthday else None,
+        "address": (
+            {
+                "street": address.street,
+                "city": address.city,
+                "postal_code": address.postal_code,
+                "country": address.country,
+            }
+            if address
+            else None
+        ),
+    }
+
+
+def _render_jsonl(record: Record) -> str:
+    return json.dumps(_record_object(record), ensure_ascii=False) + "\n"
+
+
+def _jsonl_writer(f):
+    def write(record: Record):
+        f.write(record.rendered("jsonl", _render_jsonl))
+
+    return write
+
+
+WRITERS = {"csv": _csv_writer, "vcard": _vcard_writer, "jsonl": _jsonl_writer}
+
+
+def export_file(book: AddressBook, file_format: str, filename: str, queries: list[str] | None = None) -> ExportResult:
+    """Exports the contacts, or the ones matching search queries, to a file.
+
+    Records are streamed from the book one by one and written through a large
+    buffer, so memory use does not grow with the book. A filtered export walks only
+    the matches found by ``iter_by_query``. JSON lines files also get the notes of an
+    unfiltered export, after the contacts. The file is written under a temporary
+    name and moved in place at the end, so a failed export leaves no partial file.
+    The text of every record is cached on it, so exporting an unchanged book again
+    only renders the records changed since.
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f"Unknown export format {file_format}, use one of: {', '.join(WRITERS)}")
+
+    records = book.iter_by_query(queries) if queries else book.iter_records()
+    evict = book.flush if isinstance(book, SQLiteAddressBook) else None
+    result = ExportResult()
+    tmp_filename = f"{filename}.tmp"
+    try:
+        with open(tmp_filename, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER) as f:
+            write = WRITERS[file_format](f)
+            for record in records:
+                check_cancelled()
+                write(record)
+                result.contacts += 1
+                if evict is not None and result.contacts % EVICT_RECORDS == 0:
+                    evict()
+
+            if file_format == "jsonl" and not queries:
+                for note in book.iter_notes():
+                    check_cancelled()
+                    f.write(json.dumps({"title": note.title, "text": note.text, "tags": note.tags}, ensure_ascii=False))
+                    f.write("\n")
+                    result.notes += 1
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return result
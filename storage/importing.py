@@ -0,0 +1,356 @@
+"""Bulk import of contacts from CSV, vCard and JSON lines files, and of notes from JSON lines."""
+
+import csv
+import datetime
+import json
+import os
+import re
+from collections import deque
+from itertools import chain
+
+from cancellation import check_cancelled
+from models import AddressBook, Record, Name, Phone, Birthday, Email, Address
+from .loading import paused_gc
+from .sqlite_book import SQLiteAddressBook
+
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".vcf": "vcard",
+    ".vcard": "vcard",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+# Rows are validated in chunks of this size, in worker processes for larger files.
+CHUNK_ROWS = 5_000
+
+# SQLite write-back happens every this many merged rows, so the identity map stays small.
+FLUSH_ROWS = 50_000
+
+_whitespace = re.compile(r"\s+")
+_vcard_date = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+
+class ImportResult:
+    """Class representing the outcome of an import."""
+
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.notes = 0
+        self.rejected: list[tuple[int, str]] = []
+
+    @property
+    def imported(self) -> int:
+        """Rows merged into the book."""
+        return self.added + self.updated
+
+
+def detect_format(filename: str) -> str:
+    """Returns the import format of a file by its extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown file type {extension or filename}, use one of: {', '.join(IMPORT_FORMATS)}")
+    return IMPORT_FORMATS[extension]
+
+
+def _read_csv(f):
+    """Yields (line, fields) for the rows of a CSV file with a header line."""
+    reader = csv.DictReader(f)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [field.strip().lower() for field in reader.fieldnames]
+    for row in reader:
+        phones = row.get("phones") or row.get("phone") or ""
+        row["phones"] = [phone for phone in phones.split(";") if phone.strip()]
+        yield reader.line_num, row
+
+
+def _read_jsonl(f):
+    """Yields (line, fields) for the objects of a JSON lines file.
+
+    Objects with a ``title`` instead of a ``name`` are notes.
+    """
+    for line_number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as err:
+            row = {"error": f"invalid JSON: {err}"}
+        if not isinstance(row, dict):
+            row = {"error": "expected a JSON object"}
+        phones = row.get("phones", row.get("phone")) or []
+        row["phones"] = [phones] if isinstance(phones, str) else phones
+        if isinstance(row.get("address"), dict):
+            row.update(row.pop("address"))
+        yield line_number, row
+
+
+def _unescape_vcard(value: str) -> str:
+    return value.replace("\\n", "\n").replace("\\N", "\n").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+
+def _split_vcard(value: str) -> list[str]:
+    """Splits a structured vCard value on unescaped semicolons."""
+    return [_unescape_vcard(part) for part in re.split(r"(?<!\\);", value)]
+
+
+def _vcard_lines(f):
+    """Yields (line, text) with folded lines joined."""
+    pending = None
+    for line_number, line in enumerate(f, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending[1] += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = [line_number, line]
+    if pending is not None:
+        yield pending
+
+
+def _read_vcard(f):
+    """Yields (line, fields) for the cards of a vCard file."""
+    row = None
+    for line_number, line in _vcard_lines(f):
+        prop, _, value = line.partition(":")
+        name = prop.split(";")[0].split(".")[-1].upper()
+        if name == "BEGIN" and value.upper() == "VCARD":
+            row, start = {"phones": []}, line_number
+        elif row is None:
+            continue
+        elif name == "END":
+            yield start, row
+            row = None
+        elif name == "FN":
+            row["name"] = _unescape_vcard(value)
+        elif name == "N" and "name" not in row:
+            family, given, *_ = _split_vcard(value) + [""]
+            row["name"] = f"{given} {family}".strip()
+        elif name == "TEL":
+            row["phones"].append(value.removeprefix("tel:"))
+        elif name == "EMAIL" and "email" not in row:
+            row["email"] = value
+        elif name == "BDAY":
+            match = _vcard_date.match(value)
+            row["birthday"] = f"{match[3]}.{match[2]}.{match[1]}" if match else value
+        elif name == "ADR" and "street" not in row:
+            _, _, street, city, _, postal_code, country, *_ = _split_vcard(value) + [""] * 7
+            row.update(street=street, city=city, postal_code=postal_code, country=country)
+
+
+READERS = {"csv": _read_csv, "vcard": _read_vcard, "jsonl": _read_jsonl}
+
+
+def _validate_row(fields: dict) -> list:
+    """Validates and normalizes the fields of one contact.
+
+    Returns ``[name, phones, birthday, email, address]`` built from plain values, with
+    the birthday as ``[year, month, day]``, so rows are cheap to send between
+    processes and can be written to the journal as JSON.
+    """
+    if "error" in fields:
+        raise ValueError(fields["error"])
+    name = _whitespace.sub("_", str(fields.get("name") or "").strip())
+    if not name:
+        raise ValueError("missing name")
+
+    phones = []
+    for phone in fields.get("phones") or []:
+        phone = Phone(str(phone)).value
+        if phone not in phones:
+            phones.append(phone)
+
+    birthday = fields.get("birthday")
+    if birthday:
+        value = Birthday(str(birthday).strip()).value
+        birthday = [value.year, value.month, value.day]
+
+    email = str(fields.get("email") or "").strip()
+    email = Email(email).value if email else None
+
+    address = [str(fields.get(key) or "").strip() for key in ("street", "city", "postal_code", "country")]
+    return [name, phones, birthday or None, email, address if any(address) else None]
+
+
+def _validate_note(fields: dict) -> list:
+    """Validates the fields of one note, returns ``[title, text, tags]``."""
+    title = _whitespace.sub("_", str(fields["title"]).strip())
+    if not title:
+        raise ValueError("missing title")
+    tags = fields.get("tags") or []
+    if isinstance(tags, str) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags must be a list of strings")
+    return [title, str(fields.get("text") or ""), [tag for tag in tags if tag]]
+
+
+def validate_rows(rows: list[tuple[int, dict]]) -> tuple[list[list], list[list], list[tuple[int, str]]]:
+    """Validates a chunk of rows.
+
+    Returns the normalized contacts, the normalized notes and the (line, reason) of
+    the rejected rows.
+    """
+    contacts = []
+    notes = []
+    rejected = []
+    for line_number, fields in rows:
+        try:
+            if "title" in fields and "name" not in fields:
+                notes.append(_validate_note(fields))
+            else:
+                contacts.append(_validate_row(fields))
+        except (ValueError, TypeError, AttributeError) as err:
+            rejected.append((line_number, str(err)))
+    return contacts, notes, rejected
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validated_chunks(chunks, workers: int):
+    """Yields validated chunks in order, validating up to two chunks per worker ahead."""
+    first = next(chunks, None)
+    if first is None:
+        return
+    second = next(chunks, None)
+    if second is None or workers <= 1:
+        # A small file does not pay for starting processes.
+        for chunk in chain([first], [second] if second else [], chunks):
+            check_cancelled()
+            yield validate_rows(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque(executor.submit(validate_rows, chunk) for chunk in (first, second))
+        try:
+            while pending:
+                check_cancelled()
+                while len(pending) < 2 * workers and (chunk := next(chunks, None)) is not None:
+                    pending.append(executor.submit(validate_rows, chunk))
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _field(cls, value):
+    """Creates a field from a value validated already, skipping the validation."""
+    field = cls.__new__(cls)
+    field.value = value
+    return field
+
+
+def merge_rows(book: AddressBook, rows: list[list]) -> tuple[int, int]:
+    """Merges normalized rows into the book and returns how many contacts were (added, updated).
+
+    New contacts are built directly from the validated values and added together
+    with ``add_records``. For an existing contact, or a name repeated in the rows,
+    the phones are added and the other fields present in the row replace its own
+    when they differ. Listeners get the changes of all the rows in one batch.
+    """
+    with book.events.batch():
+        return _merge_rows(book, rows)
+
+
+def _merge_rows(book: AddressBook, rows: list[list]) -> tuple[int, int]:
+    data = book.data
+    new = {}
+    updated = 0
+    for name, phones, birthday, email, address in rows:
+        record = new.get(name)
+        if record is None and Name(name) not in data:
+            record = Record(name)
+            record.phones = [_field(Phone, phone) for phone in phones]
+            record.birthday = _field(Birthday, datetime.datetime(*birthday)) if birthday else None
+            record.email = _field(Email, email) if email else None
+            record.address = Address(*address) if address else None
+            new[name] = record
+            continue
+
+        if record is None:
+            record = book.find(name)
+            updated += 1
+        for phone in phones:
+            if _field(Phone, phone) not in record.phones:
+                record.add_phone(phone)
+        # Unchanged fields are skipped, so importing a file again does not touch the indexes.
+        if birthday and (record.birthday is None or record.birthday.value != datetime.datetime(*birthday)):
+            record.add_birthday(datetime.date(*birthday).strftime("%d.%m.%Y"))
+        if email and (record.email is None or record.email.value != email):
+            record.add_email(email)
+        if address and record.address != Address(*address):
+            record.add_address(*address)
+
+    book.add_records(list(new.values()))
+    return len(new), updated
+
+
+def merge_notes(book: AddressBook, notes: list[list]) -> int:
+    """Adds notes to the book; an existing note gets the new text and the missing tags."""
+    with book.events.batch():
+        for title, text, tags in notes:
+            if title not in book.notes:
+                book.add_note(title, text, tags)
+                continue
+            if book.notes[title].text != text:
+                book.edit_note_text(title, text)
+            missing = [tag for tag in tags if tag not in book.notes[title].tags]
+            if missing:
+                book.add_tags_to_note(title, missing)
+    return len(notes)
+
+
+def import_file(
+    book: AddressBook, filename: str, file_format: str | None = None, workers: int | None = None
+) -> ImportResult:
+    """Imports contacts from a CSV, vCard or JSON lines file, and notes from JSON lines.
+
+    The file is read as a stream of chunks that are validated in worker processes
+    while earlier chunks are merged, so memory holds only a few chunks at a time.
+    Every merged chunk is journaled with its normalized rows: replay does not need
+    the file.
+    """
+    reader = READERS[file_format or detect_format(filename)]
+    workers = workers or os.cpu_count() or 1
+    result = ImportResult()
+    flush = book.flush if isinstance(book, SQLiteAddressBook) else None
+    unflushed = 0
+
+    with open(filename, encoding="utf-8-sig", newline="") as f, paused_gc():
+        for valid, notes, rejected in _validated_chunks(_chunks(reader(f), CHUNK_ROWS), workers):
+            result.rejected.extend(rejected)
+            if notes:
+                try:
+                    result.notes += merge_notes(book, notes)
+                finally:
+                    book.changes += 1
+                    if book.journal is not None:
+                        book.journal.append("import_notes", notes)
+            if not valid:
+                continue
+            try:
+                added, updated = merge_rows(book, valid)
+            finally:
+                book.changes += 1
+                if book.journal is not None:
+                    book.journal.append("import_records", valid)
+            result.added += added
+            result.updated += updated
+
+            unflushed += len(valid)
+            if flush is not None and unflushed >= FLUSH_ROWS:
+                flush()
+                unflushed = 0
+    return result
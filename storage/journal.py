@@ -0,0 +1,229 @@
+"""Append-only write-ahead journal on top of the pickle snapshot."""
+
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+from models import AddressBook, BookSnapshot
+from models.note_search import NoteSearchIndex
+from operations import OPERATIONS
+from .importing import merge_notes, merge_rows
+from .loading import paused_gc
+
+
+def _import_records(rows, book):
+    merge_rows(book, rows)
+
+
+def _import_notes(notes, book):
+    merge_notes(book, notes)
+
+
+# Maps the name of a journaled operation to the change it makes; handlers make the same calls.
+REPLAY_OPERATIONS = {**OPERATIONS, "import_records": _import_records, "import_notes": _import_notes}
+
+
+class Journal:
+    """Class representing an append-only log of address book mutations.
+
+    Every entry is a JSON line ``[seq, op, *args]``. Entries are flushed to the OS
+    on every append and fsynced in batches. The snapshot stores the sequence number
+    of the last entry it contains, so replay skips everything already folded in.
+
+    Inside ``transaction`` entries are collected in memory and written as a single
+    ``[seq, "batch", [[op, *args], ...]]`` line: a torn write drops the whole batch.
+    """
+
+    def __init__(
+        self,
+        filename: str = "addressbook.journal",
+        snapshot: str = "addressbook.pkl",
+        sync_every: int = 32,
+        sync_interval: float = 1.0,
+        compact_threshold: int = 1024 * 1024,
+    ):
+        self.filename = filename
+        self.snapshot = snapshot
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_threshold = compact_threshold
+        self.seq = 0
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._compaction = None
+        self._batch = None
+
+    @property
+    def rotated_filename(self) -> str:
+        """Journal that is being folded into a new snapshot."""
+        return f"{self.filename}.old"
+
+    def load(self) -> AddressBook:
+        """Loads the last snapshot and replays the journal on top of it."""
+        with paused_gc():
+            try:
+                with open(self.snapshot, "rb") as f:
+                    data = pickle.load(f)
+            except FileNotFoundError:
+                data = {}
+
+            book = AddressBook(data.get("contacts", {}), data.get("notes", {}), note_search=data.get("note_search"))
+        self.seq = data.get("seq", 0)
+
+        for filename in (self.rotated_filename, self.filename):
+            self._replay(filename, book)
+
+        self._file = open(self.filename, "ab")
+        book.journal = self
+        return book
+
+    def _replay(self, filename: str, book: AddressBook):
+        """Applies the entries of one journal file that are newer than the snapshot."""
+        try:
+            f = open(filename, "rb+")
+        except FileNotFoundError:
+            return
+
+        with f:
+            offset = 0
+            for line in f:
+                try:
+                    seq, op, *args = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+
+                if seq <= self.seq:
+                    continue
+                self.seq = seq
+                entries = args[0] if op == "batch" else [[op, *args]]
+                for op, *args in entries:
+                    try:
+                        REPLAY_OPERATIONS[op](*args, book)
+                    except (ValueError, IndexError, KeyError, TypeError):
+                        # The handler failed the same way when the entry was written.
+                        pass
+
+            # Drop a torn tail left by a crash in the middle of a write.
+            f.truncate(offset)
+
+    def append(self, op: str, *args):
+        """Appends an operation to the journal."""
+        with self._lock:
+            if self._batch is not None:
+                self._batch.append([op, *args])
+                return
+            self._write(op, *args)
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def _write(self, op: str, *args):
+        self.seq += 1
+        entry = json.dumps([self.seq, op, *args], ensure_ascii=False, separators=(",", ":"))
+        self._file.write(entry.encode() + b"\n")
+        self._file.flush()
+        self._pending += 1
+
+    @contextmanager
+    def transaction(self):
+        """Groups the appended operations into one entry that is synced on exit."""
+        with self._lock:
+            self._batch = []
+        try:
+            yield self
+        finally:
+            with self._lock:
+                batch, self._batch = self._batch, None
+                if batch:
+                    self._write("batch", batch)
+                    self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Forces pending entries to disk."""
+        with self._lock:
+            self._sync()
+
+    def maybe_compact(self, book: AddressBook):
+        """Starts a background compaction once the journal passes the size threshold."""
+        if self._compaction is not None and not self._compaction.is_alive():
+            # The snapshot is written, so changes need not copy records and notes first.
+            self._compaction = None
+            book.copy_on_write = None
+        if self._file.tell() < self.compact_threshold or self._compaction is not None:
+            return
+        self.compact(book)
+
+    def compact(self, book: AddressBook, wait: bool = False):
+        """Folds the journal into a new snapshot.
+
+        Under the lock the journal is rotated and the records and notes are taken as a
+        ``BookSnapshot``, which copies two dicts, not the records; the book copies a
+        record or note before its first change after that. Indexing the snapshot's
+        notes for search, pickling and writing it happen in a background thread, so
+        commands only wait for the two dict copies, O(book size) but no serialization.
+        The book must not be shared through ``ConcurrentAddressBook``, which manages
+        copy-on-write itself.
+        """
+        if self._compaction is not None:
+            self._compaction.join()
+
+        with self._lock:
+            self._sync()
+            snapshot = BookSnapshot(book)
+            book.copy_on_write = set()
+            seq = self.seq
+            self._file.close()
+            self._rotate()
+            self._file = open(self.filename, "ab")
+
+        self._compaction = threading.Thread(target=self._write_snapshot, args=(snapshot, seq), daemon=True)
+        self._compaction.start()
+        if wait:
+            self._compaction.join()
+
+    def _rotate(self):
+        """Moves the live journal aside, keeping entries of a failed earlier compaction."""
+        if not os.path.exists(self.rotated_filename):
+            os.replace(self.filename, self.rotated_filename)
+            return
+
+        with open(self.filename, "rb") as src, open(self.rotated_filename, "ab") as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.filename)
+
+    def _write_snapshot(self, snapshot: BookSnapshot, seq: int):
+        # The book's own search index keeps changing, so the snapshot gets one of its own.
+        note_search = NoteSearchIndex(snapshot.notes.values())
+        payload = pickle.dumps(
+            {"contacts": snapshot.data, "notes": snapshot.notes, "note_search": note_search, "seq": seq}
+        )
+        tmp_filename = f"{self.snapshot}.tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, self.snapshot)
+        os.remove(self.rotated_filename)
+
+    def close(self):
+        """Waits for a running compaction and syncs the journal."""
+        if self._compaction is not None:
+            self._compaction.join()
+        with self._lock:
+            self._sync()
+            self._file.close()
@@ -0,0 +1,21 @@
+"""Helpers for loading large pickled books."""
+
+import gc
+from contextlib import contextmanager
+
+
+@contextmanager
+def paused_gc():
+    """Pauses the cyclic garbage collector while a book is being loaded.
+
+    Unpickling and indexing allocate millions of container objects and none of them
+    can be garbage yet, but every few hundred allocations trigger a collection that
+    walks the young objects again.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,598 @@
+"""SQLite-backed address book with lazy record loading."""
+
+import datetime
+import json
+import os
+import pickle
+import sqlite3
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+
+from models import AddressBook, Record, Name, Phone, Note
+from models.email_index import reversed_domain
+from models.note_search import parse_query
+from models.name_index import SIMILAR_CANDIDATES, padded_trigrams, edit_distance
+from .loading import paused_gc
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    name_lower TEXT NOT NULL,
+    birthday TEXT,
+    email TEXT,
+    email_domain TEXT,
+    street TEXT,
+    city TEXT,
+    postal_code TEXT,
+    country TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_birthday ON contacts (birthday);
+CREATE INDEX IF NOT EXISTS contacts_birthday_day ON contacts (substr(birthday, 6));
+CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS contacts_email_domain ON contacts (email_domain);
+CREATE TABLE IF NOT EXISTS phones (
+    contact_id INTEGER NOT NULL REFERENCES contacts (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (contact_id, position)
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones (phone);
+CREATE TABLE IF NOT EXISTS name_trigrams (
+    contact_id INTEGER NOT NULL REFERENCES contacts (id) ON DELETE CASCADE,
+    trigram TEXT NOT NULL,
+    PRIMARY KEY (trigram, contact_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS name_trigrams_contact ON name_trigrams (contact_id);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (note_id, position)
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (title, text, content = 'notes', content_rowid = 'id');
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    INSERT INTO notes_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+"""
+
+CONTACT_COLUMNS = "c.name, c.birthday, c.email, c.street, c.city, c.postal_code, c.country"
+PHONES_COLUMN = (
+    "(SELECT group_concat(phone, ' ') FROM "
+    "(SELECT phone FROM phones WHERE contact_id = c.id ORDER BY position))"
+)
+# Tags may contain spaces, so they come back as a JSON array.
+TAGS_COLUMN = "(SELECT json_group_array(tag) FROM (SELECT tag FROM tags WHERE note_id = n.id ORDER BY position))"
+
+
+def _record_row(record: Record) -> tuple:
+    """Returns the column values of a record, used to detect in-place changes."""
+    birthday = record.birthday.value.strftime("%Y-%m-%d") if record.birthday else None
+    address = record.address
+    return (
+        record.name.value,
+        birthday,
+        record.email.value if record.email else None,
+        address.street if address else None,
+        address.city if address else None,
+        address.postal_code if address else None,
+        address.country if address else None,
+        tuple(phone.value for phone in record.phones),
+    )
+
+
+def _record_from_row(row: tuple) -> Record:
+    name, birthday, email, street, city, postal_code, country, phones = row
+    record = Record(name)
+    record.phones = [Phone(phone) for phone in phones.split(" ")] if phones else []
+    if birthday:
+        year, month, day = birthday.split("-")
+        record.add_birthday(f"{day}.{month}.{year}")
+    if email:
+        record.add_email(email)
+    if street is not None:
+        record.add_address(street, city, postal_code, country)
+    return record
+
+
+def _note_row(note: Note) -> tuple:
+    return note.title, note.text, tuple(note.tags)
+
+
+def _note_from_row(row: tuple) -> Note:
+    title, text, tags = row
+    return Note(title, text, json.loads(tags))
+
+
+class _LazyMapping(MutableMapping, ABC):
+    """Mapping that materializes objects from SQLite on access.
+
+    Inserts and deletes go straight to the database. Objects handed out are kept in
+    an identity map together with their row values, and ``flush`` writes back only
+    the ones that were changed in place.
+    """
+
+    # SELECT ... FROM <table> <alias> producing rows for ``_from_row``.
+    _query = ""
+    # Condition on the alias that skips rows up to the one with the given key.
+    _cursor_condition = ""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._cache = {}
+
+    def _key(self, key):
+        return key
+
+    @abstractmethod
+    def _select(self, key):
+        """Returns the row of the key, or None."""
+
+    @abstractmethod
+    def _select_all(self):
+        """Returns all rows in insertion order."""
+
+    @abstractmethod
+    def _row(self, value) -> tuple:
+        """Returns the column values of an object."""
+
+    @abstractmethod
+    def _from_row(self, row: tuple):
+        """Creates an object from a row."""
+
+    @abstractmethod
+    def _write(self, key, row: tuple):
+        """Inserts or updates the row of the key."""
+
+    @abstractmethod
+    def _remove(self, key):
+        """Deletes the row of the key."""
+
+    def _remember(self, key, value, row):
+        self._cache[key] = (value, row)
+        return value
+
+    def _load(self, key, row: tuple):
+        # Remember the values as ``_row`` gives them, which differ in form from the query's.
+        value = self._from_row(row)
+        return self._remember(key, value, self._row(value))
+
+    def __getitem__(self, key):
+        key = self._key(key)
+        if key in self._cache:
+            return self._cache[key][0]
+        row = self._select(key)
+        if row is None:
+            raise KeyError(key)
+        return self._load(key, row)
+
+    def __setitem__(self, key, value):
+        key = self._key(key)
+        row = self._row(value)
+        self._write(key, row)
+        self._remember(key, value, row)
+
+    def __delitem__(self, key):
+        key = self._key(key)
+        if key not in self:
+            raise KeyError(key)
+        self._remove(key)
+        self._cache.pop(key, None)
+
+    def __contains__(self, key):
+        key = self._key(key)
+        return key in self._cache or self._select(key) is not None
+
+    def _materialize(self, row: tuple):
+        key = self._key(row[0])
+        if key in self._cache:
+            return self._cache[key][0]
+        return self._load(key, row)
+
+    def _stream(self, rows):
+        """Yields the objects of the rows, forgetting each one it loaded when the next is requested.
+
+        Objects changed in place before that stay in the identity map until ``flush``,
+        as do the ones that were materialized before, so a full pass over the table
+        holds one unchanged object at a time. Changes made to an object after moving
+        past it are not written back.
+        """
+        loaded = None
+        try:
+            for row in rows:
+                if loaded is not None:
+                    self._forget_unchanged(loaded)
+                key = self._key(row[0])
+                if key in self._cache:
+                    loaded = None
+                    yield self._cache[key][0]
+                else:
+                    loaded = key
+                    yield self._load(key, row)
+        finally:
+            if loaded is not None:
+                self._forget_unchanged(loaded)
+
+    def _forget_unchanged(self, key):
+        cached = self._cache.get(key)
+        if cached is not None and self._row(cached[0]) == cached[1]:
+            del self._cache[key]
+
+    def values(self):
+        return self._stream(self._select_all())
+
+    def _select_where(self, where: str, params: tuple, limit: int | None = None, offset: int = 0, after=None):
+        self.flush()
+        if after is not None:
+            where = f"({where}) AND {self._cursor_condition}"
+            params = (*params, after)
+        return self._conn.execute(
+            f"{self._query} WHERE {where} ORDER BY id LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset),
+        )
+
+    def iter_select(
+        self, where: str = "1", params: tuple = (), limit: int | None = None, offset: int = 0, after=None
+    ):
+        """Yields a page of objects matching an SQL condition, fetching rows as they are consumed.
+
+        ``after`` is the key of the last object of the previous page. Unchanged objects
+        are forgotten as the iteration advances, see ``_stream``.
+        """
+        return self._stream(self._select_where(where, params, limit, offset, after))
+
+    def items(self):
+        for value in self.values():
+            yield self._key(self._row(value)[0]), value
+
+    def flush(self):
+        """Writes back objects that were changed in place."""
+        for key, (value, row) in self._cache.items():
+            new_row = self._row(value)
+            if new_row != row:
+                self._write(key, new_row)
+                self._cache[key] = (value, new_row)
+
+    def evict(self):
+        """Forgets all materialized objects."""
+        self._cache.clear()
+
+
+class _LazyRecords(_LazyMapping):
+    """Contacts keyed by ``Name``, attached to the book they are loaded for."""
+
+    _query = f"SELECT {CONTACT_COLUMNS}, {PHONES_COLUMN} FROM contacts c"
+    _cursor_condition = "c.id > (SELECT id FROM contacts WHERE name = ?)"
+
+    def __init__(self, conn: sqlite3.Connection, book: "SQLiteAddressBook"):
+        super().__init__(conn)
+        self._book = book
+
+    def _key(self, key):
+        return key if isinstance(key, Name) else Name(key)
+
+    def _select(self, key):
+        return self._conn.execute(f"{self._query} WHERE c.name = ?", (key.value,)).fetchone()
+
+    def _select_all(self):
+        return self._conn.execute(f"{self._query} ORDER BY c.id")
+
+    def _row(self, value):
+        return _record_row(value)
+
+    def _from_row(self, row):
+        record = _record_from_row(row)
+        record.book = self._book
+        return record
+
+    def _write(self, key, row):
+        name, birthday, email, street, city, postal_code, country, phones = row
+        email_domain = reversed_domain(email.rpartition("@")[2]) if email else None
+        contact_id = self._conn.execute("SELECT id FROM contacts WHERE name = ?", (name,)).fetchone()
+        if contact_id is None:
+            cursor = self._conn.execute(
+                "INSERT INTO contacts "
+                "(name, name_lower, birthday, email, email_domain, street, city, postal_code, country) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, name.lower(), birthday, email, email_domain, street, city, postal_code, country),
+            )
+            contact_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO name_trigrams (contact_id, trigram) VALUES (?, ?)",
+                [(contact_id, trigram) for trigram in padded_trigrams(name.lower())],
+            )
+        else:
+            (contact_id,) = contact_id
+            self._conn.execute(
+                "UPDATE contacts SET birthday = ?, email = ?, email_domain = ?, "
+                "street = ?, city = ?, postal_code = ?, country = ? WHERE id = ?",
+                (birthday, email, email_domain, street, city, postal_code, country, contact_id),
+            )
+            self._conn.execute("DELETE FROM phones WHERE contact_id = ?", (contact_id,))
+        self._conn.executemany(
+            "INSERT INTO phones (contact_id, position, phone) VALUES (?, ?, ?)",
+            [(contact_id, position, phone) for position, phone in enumerate(phones)],
+        )
+
+    def _remove(self, key):
+        self._conn.execute("DELETE FROM contacts WHERE name = ?", (key.value,))
+
+    def __iter__(self):
+        for (name,) in self._conn.execute("SELECT name FROM contacts ORDER BY id"):
+            yield Name(name)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def clear(self):
+        self._conn.execute("DELETE FROM contacts")
+        self._cache.clear()
+
+    def select(self, where: str, params: tuple) -> list[Record]:
+        """Materializes the contacts matching an SQL condition on ``contacts c`` and remembers them."""
+        return [self._materialize(row) for row in self._select_where(where, params)]
+
+
+class _LazyNotes(_LazyMapping):
+    """Notes keyed by title."""
+
+    _query = f"SELECT n.title, n.text, {TAGS_COLUMN} FROM notes n"
+    _cursor_condition = "n.id > (SELECT id FROM notes WHERE title = ?)"
+
+    def _select(self, key):
+        return self._conn.execute(f"{self._query} WHERE n.title = ?", (key,)).fetchone()
+
+    def _select_all(self):
+        return self._conn.execute(f"{self._query} ORDER BY n.id")
+
+    def _row(self, value):
+        return _note_row(value)
+
+    def _from_row(self, row):
+        return _note_from_row(row)
+
+    def _write(self, key, row):
+        title, text, tags = row
+        note_id = self._conn.execute("SELECT id FROM notes WHERE title = ?", (title,)).fetchone()
+        if note_id is None:
+            note_id = self._conn.execute("INSERT INTO notes (title, text) VALUES (?, ?)", (title, text)).lastrowid
+        else:
+            (note_id,) = note_id
+            self._conn.execute("UPDATE notes SET text = ? WHERE id = ?", (text, note_id))
+            self._conn.execute("DELETE FROM tags WHERE note_id = ?", (note_id,))
+        self._conn.executemany(
+            "INSERT INTO tags (note_id, position, tag) VALUES (?, ?, ?)",
+            [(note_id, position, tag) for position, tag in enumerate(tags)],
+        )
+
+    def _remove(self, key):
+        self._conn.execute("DELETE FROM notes WHERE title = ?", (key,))
+
+    def __iter__(self):
+        for (title,) in self._conn.execute("SELECT title FROM notes ORDER BY id"):
+            yield title
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def clear(self):
+        self._conn.execute("DELETE FROM notes")
+        self._cache.clear()
+
+
+class _IndexedBySQLite:
+    """Stands in for an in-memory index that SQLite replaces; records report their changes to it for nothing."""
+
+    def add(self, *args):
+        pass
+
+    def remove(self, *args):
+        pass
+
+    def clear(self):
+        pass
+
+    def build(self):
+        pass
+
+
+class SQLiteAddressBook(AddressBook):
+    """Address book stored in a local SQLite file.
+
+    Records and notes are materialized only when they are touched; ``commit`` writes
+    back the ones that were changed and forgets the rest.
+    """
+
+    def __init__(self, filename: str = "addressbook.db"):
+        super().__init__()
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self.phone_index = self.birthday_calendar = self.email_index = _IndexedBySQLite()
+        self.data = _LazyRecords(self.conn, self)
+        self.notes = _LazyNotes(self.conn)
+
+    @classmethod
+    def open(cls, filename: str = "addressbook.db", migrate_from: str = "addressbook.pkl") -> "SQLiteAddressBook":
+        """Opens the database, importing the pickle file once when the database is new."""
+        is_new = not os.path.exists(filename)
+        book = cls(filename)
+        if is_new and migrate_from and os.path.exists(migrate_from):
+            book.migrate(migrate_from)
+        return book
+
+    def migrate(self, filename: str = "addressbook.pkl"):
+        """Imports all contacts and notes from a pickle file."""
+        with open(filename, "rb") as f, paused_gc():
+            data = pickle.load(f)
+
+        for record in data.get("contacts", {}).values():
+            self.data[record.name] = record
+        for title, note in data.get("notes", {}).items():
+            self.notes[title] = note
+        self.commit()
+
+    def flush(self):
+        """Writes back changed records and notes and forgets them, keeping the transaction open."""
+        self.data.flush()
+        self.notes.flush()
+        self.data.evict()
+        self.notes.evict()
+
+    def commit(self):
+        """Writes back changed records and notes and commits the transaction."""
+        self.flush()
+        self.conn.commit()
+
+    def close(self):
+        """Commits pending changes and closes the database."""
+        self.commit()
+        self.conn.close()
+
+    def _index_record(self, record: Record):
+        """Contacts are indexed by SQLite; the record only starts publishing its changes."""
+        record.book = self
+
+    def _unindex_record(self, record: Record):
+        """Contacts are indexed by SQLite; the record stops publishing its changes."""
+        record.book = None
+
+    def _clear_indexes(self):
+        """Contacts are indexed by SQLite."""
+
+    def find_by_email(self, email: str) -> list[Record]:
+        return self.data.select("c.email = ? COLLATE NOCASE", (email,))
+
+    def find_by_domain(self, domain: str) -> list[Record]:
+        prefix = reversed_domain(domain.lstrip("@"))
+        return self.data.select("c.email_domain >= ? AND c.email_domain < ?", (prefix, prefix + "\uffff"))
+
+    def find_by_phone(self, phone: str) -> list[Record]:
+        return self.data.select("c.id IN (SELECT contact_id FROM phones WHERE phone = ?)", (Phone(phone).value,))
+
+    def find_fuzzy(self, name: str, max_distance: int = 2, limit: int = 5) -> list[Record]:
+        self.data.flush()
+        query = name.lower()
+        grams = padded_trigrams(query)
+        rows = self.conn.execute(
+            f"SELECT c.id, c.name, c.name_lower, COUNT(*) FROM name_trigrams t JOIN contacts c ON c.id = t.contact_id "
+            f"WHERE t.trigram IN ({', '.join('?' * len(grams))}) AND abs(length(c.name_lower) - ?) <= ? "
+            f"GROUP BY c.id HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC, c.id LIMIT ?",
+            (*grams, len(query), max_distance, max(1, len(grams) - 3 * max_distance), SIMILAR_CANDIDATES),
+        )
+        found = []
+        for contact_id, contact_name, lowered, count in rows:
+            distance = edit_distance(query, lowered, max_distance)
+            if distance <= max_distance:
+                found.append((distance, -count, contact_id, contact_name))
+
+        found.sort()
+        return [self.data[Name(contact_name)] for *_, contact_name in found[:limit]]
+
+    def _birthdays_on(self, month: int, day: int) -> list[str]:
+        self.data.flush()
+        rows = self.conn.execute(
+            "SELECT name FROM contacts WHERE substr(birthday, 6) = ? ORDER BY id", (f"{month:02d}-{day:02d}",)
+        )
+        return [name for (name,) in rows]
+
+    def birthday_date_counts(self) -> dict[tuple[int, int, int], int]:
+        self.data.flush()
+        rows = self.conn.execute("SELECT birthday, count(*) FROM contacts WHERE birthday IS NOT NULL GROUP BY birthday")
+        return {tuple(int(part) for part in birthday.split("-")): count for birthday, count in rows}
+
+    def _born_in(self, month: int, day: int, years: set[int]) -> list[tuple[str, int]]:
+        dates = [f"{year:04d}-{month:02d}-{day:02d}" for year in years if datetime.MINYEAR <= year <= datetime.MAXYEAR]
+        if not dates:
+            return []
+        self.data.flush()
+        rows = self.conn.execute(
+            f"SELECT name, birthday FROM contacts WHERE birthday IN ({', '.join('?' * len(dates))}) ORDER BY id", dates
+        )
+        return [(name, int(birthday[:4])) for name, birthday in rows]
+
+    def iter_records(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        return self.data.iter_select(limit=limit, offset=offset, after=after)
+
+    def iter_by_query(
+        self, queries: list[str], limit: int | None = None, offset: int = 0, after: str | None = None
+    ):
+        """Matches all queries in one statement, so each contact comes once, in insertion order."""
+        conditions = []
+        params = []
+        for kind, value in self._query_criteria(queries):
+            if kind == "name":
+                conditions.append("instr(c.name_lower, ?) > 0")
+                params.append(value)
+            elif kind == "phone":
+                conditions.append("c.id IN (SELECT contact_id FROM phones WHERE phone = ?)")
+                params.append(value.value)
+            else:
+                conditions.append("c.birthday = ?")
+                params.append(value.value.strftime("%Y-%m-%d"))
+        return self.data.iter_select(" OR ".join(conditions) or "0", tuple(params), limit, offset, after)
+
+    def iter_notes(self, limit: int | None = None, offset: int = 0, after: str | None = None):
+        return self.notes.iter_select(limit=limit, offset=offset, after=after)
+
+    def _index_note(self, note: Note):
+        """Tags are indexed by SQLite."""
+
+    def _unindex_note(self, note: Note):
+        """Tags and texts are indexed by SQLite."""
+
+    def _reindex_note_text(self, note: Note, old_text: str | None = None):
+        """Texts are indexed by SQLite."""
+
+    def iter_notes_by_tags(
+        self,
+        groups: list[list[str]],
+        excluded: list[str] = (),
+        limit: int | None = None,
+        offset: int = 0,
+        after: str | None = None,
+    ):
+        conditions = ["1"]
+        params = []
+        for group in groups:
+            conditions.append(f"n.id IN (SELECT note_id FROM tags WHERE tag IN ({', '.join('?' * len(group))}))")
+            params.extend(group)
+        if excluded:
+            conditions.append(f"n.id NOT IN (SELECT note_id FROM tags WHERE tag IN ({', '.join('?' * len(excluded))}))")
+            params.extend(excluded)
+
+        return self.notes.iter_select(" AND ".join(conditions), tuple(params), limit, offset, after)
+
+    def tag_counts(self) -> dict[str, int]:
+        self.notes.flush()
+        rows = self.conn.execute("SELECT tag, COUNT(DISTINCT note_id) FROM tags GROUP BY tag ORDER BY MIN(rowid)")
+        return dict(rows)
+
+    def search_notes(self, query: str, limit: int = 10) -> list[tuple[Note, float]]:
+        self.notes.flush()
+        terms, phrases = parse_query(query)
+        if not terms:
+            return []
+        # FTS5 ranks with BM25 too; its scores are negative, lower is better.
+        match = " OR ".join([f'"{term}"' for term in terms] + [f'"{" ".join(phrase)}"' for phrase in phrases])
+        if phrases:
+            match = f"({match}) AND " + " AND ".join(f'"{" ".join(phrase)}"' for phrase in phrases)
+        rows = self.conn.execute(
+            "SELECT title, -bm25(notes_fts) FROM notes_fts WHERE notes_fts MATCH ? ORDER BY bm25(notes_fts) LIMIT ?",
+            (match, limit),
+        )
+        return [(self.notes[title], score) for title, score in rows]